@@ -0,0 +1,331 @@
+"""
+Benchmarks of the import time, the engines, the environments and the example agents.
+
+Every benchmark returns one or more named results with a unit and whether higher is better.
+The results are printed as JSON, and compared with a baseline file: a result is a regression when it is
+worse than the baseline by more than the tolerance (a fraction of the baseline value).
+
+Usage, from the root of the repository:
+    python -m benchmarks.bench [--output results.json] [--baseline benchmarks/baseline.json]
+                               [--tolerance 0.25] [--save-baseline] [--only NAME] [--quick] [--runs N]
+The baseline is recorded with --runs 5, as the results of a single run can vary by more than the tolerance,
+and --runs defaults to the runs of the baseline, so both sides are medians of as many runs.
+"""
+import argparse
+import importlib.metadata
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# fraction of the measures, set by --quick
+SCALE = 1.0
+
+
+def _version(package: str) -> str:
+    """
+    Installed version of a package, without importing it
+    """
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def _count(n: int) -> int:
+    return max(1, int(n * SCALE))
+
+
+def _result(value: float, unit: str, higher_is_better: bool) -> dict:
+    return {'value': float(value), 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def _per_call(function, number: int, repeat: int = 5) -> float:
+    """
+    Best time of a call over `repeat` runs of `number` calls
+
+    :return: Microseconds per call
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e6
+
+
+def _random_positions(game_class, count: int, seed: int = 0) -> list:
+    """
+    Plays random games and keeps a copy of the board and player to move of each position
+    """
+    rng = np.random.default_rng(seed)
+    positions = []
+    while len(positions) < count:
+        game = game_class()
+        game.reset()
+        while not game.game_over and game.turns_count < 60 and len(positions) < count:
+            positions.append((np.copy(game.board), game.current_player))
+            moves = game.get_possible_moves(game.current_player, only_valid=True)
+            game.action_handler(*moves[rng.integers(len(moves))])
+    return positions
+
+
+def bench_find_sequence() -> dict:
+    from gym_neutreeko.game.common.gameutils import NeutreekoUtils
+    from gym_neutreeko.game.engine.gamelogic import NeutreekoGame
+
+    boards = [board for board, _ in _random_positions(NeutreekoGame, 64)]
+    sequence = np.array([2, 2, 2], dtype=np.int8)
+    iterator = iter(boards * _count(200))
+    return {'find_sequence_board': _result(
+        _per_call(lambda: NeutreekoUtils.find_sequence_board(next(iterator), sequence), _count(2000), 3),
+        'us/call', False)}
+
+
+def bench_possible_moves() -> dict:
+    from gym_neutreeko.game.engine.bitboard import BitboardGame
+    from gym_neutreeko.game.engine.gamelogic import NeutreekoGame
+
+    results = {}
+    positions = _random_positions(NeutreekoGame, 64)
+    for name, game_class in (('numpy', NeutreekoGame), ('bitboard', BitboardGame)):
+        game = game_class()
+        game.reset()
+        board, player = positions[len(positions) // 2]
+        game.current_player = player
+        game.board = np.copy(board)
+        results[f'get_possible_moves[{name}]'] = _result(
+            _per_call(lambda: game.get_possible_moves(game.current_player, only_valid=True), _count(2000)),
+            'us/call', False)
+        results[f'legal_moves[{name}]'] = _result(_per_call(game.legal_moves, _count(2000)), 'us/call', False)
+    return results
+
+
+def _steps_per_second(env, steps: int, seed: int = 0) -> float:
+    """
+    Steps an environment with random valid actions, resetting it when an episode ends
+    """
+    rng = np.random.default_rng(seed)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        valid = np.flatnonzero(env.action_mask)
+        _, _, done, _ = env.step(int(valid[rng.integers(len(valid))]))
+        if done:
+            env.reset()
+    return steps / (time.perf_counter() - start)
+
+
+def bench_env_step() -> dict:
+    from gym_neutreeko.envs import NeutreekoEnv, NeutreekoEasyEnv
+
+    results = {}
+    for env_class in (NeutreekoEnv, NeutreekoEasyEnv):
+        for bitboard in (False, True):
+            name = f"{env_class.__name__}.step[{'bitboard' if bitboard else 'numpy'}]"
+            results[name] = _result(_steps_per_second(env_class(bitboard=bitboard), _count(20000)), 'steps/s', True)
+    return results
+
+
+def bench_random_games() -> dict:
+    from gym_neutreeko.envs import NeutreekoEnv
+
+    from examples.RandomAgent import RandomAgent
+
+    results = {}
+    agent = RandomAgent()
+    for bitboard in (False, True):
+        env = NeutreekoEnv(bitboard=bitboard)
+        games = _count(200)
+        start = time.perf_counter()
+        for _ in range(games):
+            env.reset()
+            done = False
+            while not done:
+                _, _, done, _ = env.step(agent.choice(env))
+        name = f"random_vs_random[{'bitboard' if bitboard else 'numpy'}]"
+        results[name] = _result(games / (time.perf_counter() - start), 'games/s', True)
+    return results
+
+
+def bench_agents() -> dict:
+    from gym_neutreeko.envs import NeutreekoEnv, NeutreekoEasyEnv
+    from gym_neutreeko.game.engine.gamelogic import NeutreekoGame
+
+    from examples.AlphaBetaAgent import AlphaBetaAgent
+    from examples.MCTSAgent import MCTSAgent
+    from examples.QAgent import QAgent
+    from examples.RandomAgent import RandomAgent
+
+    agents = {
+        'RandomAgent': (RandomAgent(), False),
+        'QAgent': (QAgent(), True),
+        'AlphaBetaAgent': (AlphaBetaAgent(time_limit=10, max_depth=3), False),
+        'MCTSAgent': (MCTSAgent(playouts=100, seed=0), False),
+    }
+    results = {}
+    positions = _random_positions(NeutreekoGame, _count(50), seed=1)
+    for name, (agent, easy) in agents.items():
+        latencies = []
+        if easy:
+            env = NeutreekoEasyEnv(seed=0)
+            np.random.seed(0)
+            for _ in range(len(positions)):
+                env.reset()
+                start = time.perf_counter()
+                agent.choice(env)
+                latencies.append(time.perf_counter() - start)
+        else:
+            # the board setter of the bitboard engine also updates the hash, and so the action mask
+            env = NeutreekoEnv(bitboard=True)
+            env.reset()
+            for board, player in positions:
+                env.game.current_player = player
+                env.game.board = board
+                start = time.perf_counter()
+                agent.choice(env)
+                latencies.append(time.perf_counter() - start)
+        latencies = np.array(latencies) * 1e3
+        results[f'{name}.choice.p50'] = _result(np.percentile(latencies, 50), 'ms', False)
+        results[f'{name}.choice.p99'] = _result(np.percentile(latencies, 99), 'ms', False)
+    return results
+
+
+IMPORT_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, 'gym' in sys.modules, 'numpy.random' in sys.modules)
+'''
+
+
+def bench_import() -> dict:
+    """
+    Import time of the package in a fresh interpreter, best of a few runs.
+    gym_neutreeko.core must not import gym, nor numpy.random
+    """
+    results = {}
+    for module in ('numpy', 'gym_neutreeko', 'gym_neutreeko.core', 'gym_neutreeko.envs'):
+        best = float('inf')
+        for _ in range(max(3, _count(10))):
+            output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT.format(module=module)],
+                                    capture_output=True, text=True, check=True).stdout.split()
+            best = min(best, float(output[0]))
+            if module == 'gym_neutreeko.core' and output[1] == 'True':
+                raise RuntimeError("gym_neutreeko.core imports gym")
+            if module == 'gym_neutreeko.core' and output[2] == 'True':
+                raise RuntimeError("gym_neutreeko.core imports numpy.random")
+        results[f'import[{module}]'] = _result(best * 1e3, 'ms', False)
+    return results
+
+
+BENCHMARKS = {
+    'import': bench_import,
+    'find_sequence': bench_find_sequence,
+    'possible_moves': bench_possible_moves,
+    'env_step': bench_env_step,
+    'random_games': bench_random_games,
+    'agents': bench_agents,
+}
+
+
+def run(only: str = None, runs: int = 1) -> dict:
+    """
+    Runs the benchmarks
+
+    :param only: Runs only the benchmarks whose name contains this
+    :param runs: Runs of every benchmark, the result is the median, steadier on a busy machine
+    :return: The results of every benchmark, by name
+    """
+    results = {}
+    for name, benchmark in BENCHMARKS.items():
+        if only and only not in name:
+            continue
+        samples = [benchmark() for _ in range(runs)]
+        for result_name, result in samples[0].items():
+            result['value'] = float(np.median([sample[result_name]['value'] for sample in samples]))
+            results[result_name] = result
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Finds the results worse than the baseline by more than the tolerance
+
+    :param results: Results returned by run
+    :param baseline: Results of the baseline, as stored by --save-baseline
+    :param tolerance: Accepted slowdown, as a fraction of the baseline value
+    :return: A list of (name, value, baseline value, relative change), worse first
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        reference = baseline[name]['value']
+        if not reference:
+            continue
+        change = (result['value'] - reference) / reference
+        worse = -change if result['higher_is_better'] else change
+        if worse > tolerance:
+            regressions.append((name, result['value'], reference, change))
+    return sorted(regressions, key=lambda regression: -abs(regression[3]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the engines, environments and agents')
+    parser.add_argument('--output', default=None, help='file to write the JSON results to (default: stdout)')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='baseline JSON file to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='accepted slowdown as a fraction of the baseline (default: 0.25)')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--only', default=None, help='only run the benchmarks whose name contains this')
+    parser.add_argument('--quick', action='store_true', help='10 times fewer measures, less precise')
+    parser.add_argument('--runs', type=int, default=None,
+                        help='runs of each benchmark, reports the median (default: the runs of the baseline, or 1)')
+    args = parser.parse_args()
+
+    if args.quick:
+        SCALE = 0.1
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    if args.runs is None:
+        args.runs = baseline.get('runs', 1) if baseline else 1
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        # the env entries depend on it, setup.py pins gym==0.18.0
+        'gym': _version('gym'),
+        'machine': platform.machine(),
+        'runs': args.runs,
+        'results': run(args.only, args.runs),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            file.write(text + '\n')
+    elif baseline:
+        baseline_results = baseline['results']
+        if baseline.get('gym') != report['gym']:
+            print(f"WARNING gym {report['gym']} differs from the baseline's {baseline.get('gym')}, "
+                  f"the env results aren't comparable", file=sys.stderr)
+        regressions = compare(report['results'], baseline_results, args.tolerance)
+        for name, value, reference, change in regressions:
+            print(f"REGRESSION {name}: {value:.4g} vs {reference:.4g} ({change:+.0%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regression beyond {args.tolerance:.0%} of {args.baseline}", file=sys.stderr)
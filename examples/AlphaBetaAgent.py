@@ -0,0 +1,262 @@
+import time
+
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import tables
+from gym_neutreeko.game.engine import movegen
+
+WIN_SCORE = 10000
+# scores above this are wins, stored in the transposition table relative to the node
+MATE_BOUND = WIN_SCORE - 1000
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class AlphaBetaAgent:
+    def __init__(self, time_limit: float = 1.0, max_depth: int = 64, tt_size: int = 1 << 18,
+                 replacement: str = 'depth', book=None):
+        """
+        Iterative-deepening negamax with alpha-beta pruning, for NeutreekoEnv
+
+        :param time_limit: Seconds to spend on each move
+        :param max_depth: Deepest iteration, in plies
+        :param tt_size: Number of entries of the transposition table, rounded down to a power of 2
+        :param replacement: 'depth' to keep the entries of the current search that are deeper than the new one,
+            'always' to always replace
+        :param book: An OpeningBook checked before searching, see gym_neutreeko.book
+        """
+        self.time_limit = time_limit
+        self.book = book
+        self.max_depth = max_depth
+        self.replacement = replacement
+
+        size = 1 << (tt_size.bit_length() - 1)
+        self.tt_mask = size - 1
+        self.tt_keys = [None] * size
+        self.tt_depths = [0] * size
+        self.tt_scores = [0] * size
+        self.tt_flags = [EXACT] * size
+        self.tt_moves = [None] * size
+        self.tt_ages = [0] * size
+        self.generation = 0
+
+        self.killers = [[None, None] for _ in range(max_depth + 1)]
+        self.history = [[0] * tables.NB_SQUARES for _ in range(tables.NB_SQUARES)]
+        # moves are copied out with tolist, so every node can share the buffer
+        self.move_buffer = movegen.new_move_buffer()
+
+        self.nodes = 0
+        self.deadline = None
+        self.root_move = None
+        self.last_depth = 0
+        self.last_score = 0
+        self.nodes_per_sec = 0.0
+
+    def choice(self, env):
+        """
+        Given the environment, search the best move for the player to move
+
+        :param env: A NeutreekoEnv
+        :return: the action to take, piece * 8 + direction
+        """
+        if self.book is not None:
+            action = self.book.choice(env)
+            if action is not None:
+                return action
+        player = env.game.current_player
+        other = const.WHITE if player == const.BLACK else const.BLACK
+        mover_bits = env.game.player_bits(player)
+        other_bits = env.game.player_bits(other)
+        return self.search(mover_bits, other_bits, player)[movegen.ACTION]
+
+    def search(self, mover: int, other: int, player: int) -> tuple:
+        """
+        Runs the iterative deepening until the time budget or max_depth is reached
+
+        :param mover: Bitboard of the pieces of the player to move
+        :param other: Bitboard of the pieces of the other player
+        :param player: Value of the player to move, for the hash
+        :return: The best move, a list [action, square, destination square]
+        """
+        start = time.perf_counter()
+        self.deadline = start + self.time_limit
+        self.nodes = 0
+        self.generation += 1
+        self.history = [[value >> 2 for value in row] for row in self.history]
+        pieces = [0, mover, other] if player == const.WHITE else [0, other, mover]
+        # the same hash as the engines, updated incrementally with tables.ZOBRIST in negamax
+        key = tables.zobrist_hash(tables.bits_to_board(pieces), player)
+
+        best_move = None
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score = self.negamax(mover, other, player, key, depth, -WIN_SCORE - 1, WIN_SCORE + 1, 0)
+            except SearchTimeout:
+                break
+            best_move = self.root_move
+            self.last_depth, self.last_score = depth, score
+            # a forced result was found, searching deeper won't change it
+            if abs(score) > MATE_BOUND:
+                break
+
+        if best_move is None:
+            best_move = self.moves(mover, other)[0]
+        elapsed = time.perf_counter() - start
+        self.nodes_per_sec = self.nodes / elapsed if elapsed else 0.0
+        return best_move
+
+    def moves(self, mover: int, other: int) -> list:
+        """
+        Every valid move of the player to move, see movegen.generate_moves
+
+        :param mover: Bitboard of the pieces of the player to move
+        :param other: Bitboard of the pieces of the other player
+        :return: A list of [action, square, destination square]
+        """
+        return movegen.generate_moves(mover, mover | other, out=self.move_buffer).tolist()
+
+    @staticmethod
+    def evaluate(mover: int, other: int) -> int:
+        """
+        Static evaluation for the player to move: lines with 2 of its pieces and a free cell,
+        minus the same for the other player
+        """
+        score = 0
+        for mask in tables.WIN_MASKS:
+            if not other & mask and bin(mover & mask).count('1') == 2:
+                score += 1
+            elif not mover & mask and bin(other & mask).count('1') == 2:
+                score -= 1
+        return score
+
+    def order(self, moves: list, tt_move, ply: int) -> list:
+        """
+        Sorts the moves: transposition table move, killer moves, then by history score
+        """
+        killers = self.killers[ply]
+
+        def priority(move):
+            if move == tt_move:
+                return 1 << 30
+            if move == killers[0] or move == killers[1]:
+                return 1 << 29
+            return self.history[move[movegen.FROM]][move[movegen.TO]]
+
+        moves.sort(key=priority, reverse=True)
+        return moves
+
+    def store(self, key: int, depth: int, score: int, flag: int, move, ply: int) -> None:
+        """
+        Writes an entry of the transposition table, following the replacement policy
+        """
+        slot = key & self.tt_mask
+        if self.replacement == 'depth' and self.tt_ages[slot] == self.generation and self.tt_depths[slot] > depth:
+            return
+        # wins are stored relative to this node, so they stay valid when reached from another ply
+        if score > MATE_BOUND:
+            score += ply
+        elif score < -MATE_BOUND:
+            score -= ply
+        self.tt_keys[slot] = key
+        self.tt_depths[slot] = depth
+        self.tt_scores[slot] = score
+        self.tt_flags[slot] = flag
+        self.tt_moves[slot] = move
+        self.tt_ages[slot] = self.generation
+
+    def negamax(self, mover: int, other: int, player: int, key: int, depth: int, alpha: int, beta: int,
+                ply: int) -> int:
+        """
+        Negamax with alpha-beta pruning. Moves are made and unmade on the two bitboards, nothing is copied
+
+        :return: The score for the player to move
+        """
+        self.nodes += 1
+        if not self.nodes & 1023 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        slot = key & self.tt_mask
+        tt_move = None
+        if self.tt_keys[slot] == key:
+            tt_move = self.tt_moves[slot]
+            if self.tt_depths[slot] >= depth and ply:
+                score = self.tt_scores[slot]
+                if score > MATE_BOUND:
+                    score -= ply
+                elif score < -MATE_BOUND:
+                    score += ply
+                flag = self.tt_flags[slot]
+                if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                    return score
+
+        if depth == 0:
+            return self.evaluate(mover, other)
+
+        moves = self.moves(mover, other)
+        if not moves:
+            return 0
+
+        opponent = const.WHITE if player == const.BLACK else const.BLACK
+        original_alpha = alpha
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        for move in self.order(moves, tt_move, ply):
+            _, square, destination = move
+            change = tables.SQUARE_BIT[square] | tables.SQUARE_BIT[destination]
+            mover ^= change
+            if any(mover & mask == mask for mask in tables.LINES_THROUGH[destination]):
+                score = WIN_SCORE - ply - 1
+            else:
+                child_key = key ^ tables.ZOBRIST[player][square] ^ tables.ZOBRIST[player][destination] \
+                    ^ tables.ZOBRIST_SIDE
+                score = -self.negamax(other, mover, opponent, child_key, depth - 1, -beta, -alpha, ply + 1)
+            mover ^= change
+
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if move != self.killers[ply][0]:
+                    self.killers[ply][1] = self.killers[ply][0]
+                    self.killers[ply][0] = move
+                self.history[square][destination] += depth * depth
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.store(key, depth, best_score, flag, best_move, ply)
+        if not ply:
+            self.root_move = best_move
+        return best_score
+
+    def stats(self) -> dict:
+        """
+        Statistics of the last search
+        :return: nodes, nodes per second, depth reached and score
+        """
+        return {
+            'nodes': self.nodes,
+            'nodes_per_sec': self.nodes_per_sec,
+            'depth': self.last_depth,
+            'score': self.last_score,
+        }
+
+    def update(self, obs, reward, done, info, env):
+        """
+        Not used in this agent
+        """
+        pass
+
+    def episode_update(self, episode):
+        """
+        Not used in this agent
+        """
+        pass
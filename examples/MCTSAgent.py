@@ -0,0 +1,319 @@
+import math
+import multiprocessing as mp
+import random
+import threading
+import time
+
+from gym_neutreeko.game.common import actions
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import tables
+from gym_neutreeko.game.engine.bitboard import BitboardGame
+
+
+class Node:
+    __slots__ = ('move', 'parent', 'player', 'children', 'visits', 'value', 'prior', 'terminal', 'hash')
+
+    def __init__(self, move=None, parent=None, player=None, prior=1.0):
+        """
+        A node of the search tree
+
+        :param move: The move leading to this node
+        :param parent: The parent node
+        :param player: The player who made the move, the value is from its point of view
+        :param prior: Prior probability of the move, used by PUCT
+        """
+        self.move = move
+        self.parent = parent
+        self.player = player
+        self.children = None
+        self.visits = 0
+        self.value = 0.0
+        self.prior = prior
+        self.terminal = False
+        self.hash = None
+
+
+def _root_search(args) -> dict:
+    """
+    Runs an independent search in a worker process, for root parallelism
+
+    :param args: The agent parameters, the pieces and player to move, and a seed
+    :return: The visits of each root move
+    """
+    params, pieces, player, seed = args
+    agent = MCTSAgent(**params, root_workers=1, seed=seed)
+    return agent.root_visits(pieces, player)
+
+
+class MCTSAgent:
+    def __init__(self, playouts: int = 1000, time_ms: float = None, exploration: float = 1.4, puct: bool = False,
+                 prior=None, max_playout_length: int = 100, threads: int = 1, virtual_loss: int = 3,
+                 root_workers: int = 1, reuse_tree: bool = True, seed=None, book=None):
+        """
+        Monte Carlo Tree Search for NeutreekoEnv, with UCT or PUCT selection and random playouts
+
+        :param playouts: Playouts per move, ignored if time_ms is set
+        :param time_ms: Milliseconds per move
+        :param exploration: The exploration constant
+        :param puct: Use PUCT instead of UCT
+        :param prior: Function (game, moves) -> list of probabilities of the moves, uniform if None
+        :param max_playout_length: Plies after which a playout is a draw
+        :param threads: Threads sharing the tree, using virtual loss. They share the GIL, so this only
+            helps when the prior releases it
+        :param virtual_loss: Visits added to the nodes of a path while a thread walks it
+        :param root_workers: Processes searching separate trees, whose root visits are summed
+        :param reuse_tree: Keep the subtree of the played moves between calls to choice
+        :param seed: Seed of the playout random generator
+        :param book: An OpeningBook checked before searching, see gym_neutreeko.book
+        """
+        self.playouts = playouts
+        self.time_ms = time_ms
+        self.exploration = exploration
+        self.puct = puct
+        self.prior = prior
+        self.max_playout_length = max_playout_length
+        self.threads = threads
+        self.virtual_loss = virtual_loss
+        self.root_workers = root_workers
+        self.reuse_tree = reuse_tree
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.book = book
+
+        self.root = None
+        self.lock = threading.Lock()
+        self.playout_count = 0
+        self.playouts_per_sec = 0.0
+
+    def choice(self, env):
+        """
+        Given the environment, search the best move for the player to move
+
+        :param env: A NeutreekoEnv
+        :return: the action to take, piece * 8 + direction
+        """
+        if self.book is not None:
+            action = self.book.choice(env)
+            if action is not None:
+                return action
+        pieces = [0, 0, 0]
+        pieces[const.WHITE] = env.game.player_bits(const.WHITE)
+        pieces[const.BLACK] = env.game.player_bits(const.BLACK)
+        move = self.search(pieces, env.game.current_player)
+        return None if move is None else actions.from_move(pieces[env.game.current_player], move)
+
+    def search(self, pieces: list, player: int):
+        """
+        Runs the playouts from a position and keeps the subtree of the chosen move
+
+        :param pieces: Bitboards of the position, indexed by player value
+        :param player: The player to move
+        :return: The most visited move, a tuple with a position and a direction
+        """
+        visits = self.root_visits(pieces, player)
+        if not visits:
+            return None
+        move = max(visits, key=visits.get)
+        # keep the subtree of the played move for the next call
+        self.root = next(child for child in self.root.children if child.move == move)
+        self.root.parent = None
+        return move
+
+    def root_visits(self, pieces: list, player: int) -> dict:
+        """
+        Runs the playouts from a position, in every thread and worker process
+
+        :param pieces: Bitboards of the position, indexed by player value
+        :param player: The player to move
+        :return: The visits of each root move, summed over the worker processes
+        """
+        key = tables.zobrist_hash(tables.bits_to_board(pieces), player)
+        self.root = self.reused_root(key) if self.reuse_tree else None
+        if self.root is None:
+            self.root = Node(player=const.WHITE if player == const.BLACK else const.BLACK)
+            self.root.hash = key
+
+        start = time.perf_counter()
+        self.playout_count = 0
+        pool = None
+        results = None
+        if self.root_workers > 1:
+            params = {name: getattr(self, name) for name in ('playouts', 'time_ms', 'exploration', 'puct', 'prior',
+                                                              'max_playout_length', 'threads', 'virtual_loss')}
+            params['reuse_tree'] = False
+            pool = mp.Pool(self.root_workers - 1)
+            tasks = [(params, list(pieces), player, self.random.getrandbits(32)) for _ in range(self.root_workers - 1)]
+            results = pool.map_async(_root_search, tasks)
+
+        deadline = None if self.time_ms is None else start + self.time_ms / 1000
+        workers = [threading.Thread(target=self.run, args=(pieces, player, deadline)) for _ in range(self.threads - 1)]
+        for worker in workers:
+            worker.start()
+        self.run(pieces, player, deadline)
+        for worker in workers:
+            worker.join()
+
+        visits = {child.move: child.visits for child in self.root.children or []}
+        if pool is not None:
+            for worker_visits in results.get():
+                for move, count in worker_visits.items():
+                    visits[move] = visits.get(move, 0) + count
+            pool.close()
+            pool.join()
+            self.playout_count += sum(visits.values()) - sum(child.visits for child in self.root.children or [])
+
+        elapsed = time.perf_counter() - start
+        self.playouts_per_sec = self.playout_count / elapsed if elapsed else 0.0
+        return visits
+
+    def reused_root(self, key: int):
+        """
+        Finds the position in the kept tree, among the replies to the last played move
+
+        :param key: Zobrist hash of the position
+        :return: The node of the position, None if it was never visited
+        """
+        for child in (self.root.children or []) if self.root else []:
+            if child.hash == key:
+                child.parent = None
+                return child
+        return None
+
+    def run(self, pieces: list, player: int, deadline) -> None:
+        """
+        Playout loop of a thread, on its own copy of the root position
+        """
+        game = BitboardGame()
+        game.reset()
+        game.current_player = player
+        game.board = tables.bits_to_board(pieces)
+        while True:
+            with self.lock:
+                if deadline is None and self.playout_count >= self.playouts:
+                    break
+                self.playout_count += 1
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            self.playout(game)
+
+    def select(self, node: Node) -> Node:
+        """
+        Chooses the child to visit with UCT, or PUCT. With UCT, the unvisited children come first
+        """
+        if self.puct:
+            sqrt_visits = math.sqrt(node.visits + 1)
+            return max(node.children, key=lambda child: (child.value / child.visits if child.visits else 0.5)
+                       + self.exploration * child.prior * sqrt_visits / (1 + child.visits))
+        unvisited = [child for child in node.children if not child.visits]
+        if unvisited:
+            return unvisited[self.random.randrange(len(unvisited))]
+        log_visits = math.log(node.visits)
+        return max(node.children, key=lambda child: child.value / child.visits
+                   + self.exploration * math.sqrt(log_visits / child.visits))
+
+    def expand(self, node: Node, game: BitboardGame) -> None:
+        """
+        Creates the children of a node, with their priors
+        """
+        moves = game.get_possible_moves(game.current_player, only_valid=True)
+        if self.prior:
+            priors = self.prior(game, moves)
+        else:
+            priors = [1.0 / len(moves)] * len(moves)
+        node.children = [Node(move, node, game.current_player, prior) for move, prior in zip(moves, priors)]
+
+    def playout(self, game: BitboardGame) -> None:
+        """
+        One iteration: selection, expansion, random playout and backpropagation.
+        The game is walked with push and restored with pop
+        """
+        node = self.root
+        path = [node]
+        depth = 0
+        with self.lock:
+            node.visits += self.virtual_loss
+            while node.children is not None and not node.terminal:
+                if not node.children:
+                    break
+                node = self.select(node)
+                game.push(node.move)
+                depth += 1
+                node.visits += self.virtual_loss
+                path.append(node)
+                if node.hash is None:
+                    node.hash = game.hash
+                    node.terminal = game.game_over
+            if not node.terminal and node.children is None:
+                self.expand(node, game)
+
+        if node.terminal:
+            winner = 0 if game.draw else node.player
+        else:
+            winner = self.rollout(game)
+
+        with self.lock:
+            for visited in path:
+                visited.visits += 1 - self.virtual_loss
+                if winner == visited.player:
+                    visited.value += 1
+                elif not winner:
+                    visited.value += 0.5
+        for _ in range(depth):
+            game.pop()
+
+    def rollout(self, game: BitboardGame) -> int:
+        """
+        Plays random moves until the end of the game or max_playout_length, then undoes them
+
+        :return: The winner, 0 for a draw
+        """
+        plies = 0
+        winner = 0
+        while plies < self.max_playout_length:
+            moves = game.get_possible_moves(game.current_player, only_valid=True)
+            if not moves:
+                break
+            mover = game.current_player
+            game.push(moves[self.random.randrange(len(moves))])
+            plies += 1
+            if game.game_over:
+                winner = 0 if game.draw else mover
+                break
+        for _ in range(plies):
+            game.pop()
+        return winner
+
+    def tree_size(self) -> int:
+        """
+        Number of nodes of the current tree
+        """
+        count = 0
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.children or [])
+        return count
+
+    def stats(self) -> dict:
+        """
+        Statistics of the last search
+        :return: playouts, playouts per second and size of the kept tree
+        """
+        return {
+            'playouts': self.playout_count,
+            'playouts_per_sec': self.playouts_per_sec,
+            'tree_size': self.tree_size(),
+        }
+
+    def update(self, obs, reward, done, info, env):
+        """
+        Not used in this agent
+        """
+        pass
+
+    def episode_update(self, episode):
+        """
+        Not used in this agent
+        """
+        pass
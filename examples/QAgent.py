@@ -1,6 +1,8 @@
 import gym
 import numpy as np
 
+from gym_neutreeko.tabular import QLearning
+
 
 class QAgent:
     def __init__(self, observation_space=2300, action_space=12):
@@ -10,18 +12,16 @@ class QAgent:
         :param observation_space: How many possible states there are
         :param action_space: How many actions there are
         """
-        self.Q = np.zeros((observation_space, action_space))
+        self.learner = QLearning(observation_space, action_space, alpha=0.7, discount_factor=0.618)
+
+        # transitions of the current episode, learned in one batch when it ends
+        self.transitions = []
 
-        self.alpha = 0.7  # learning rate
-        self.discount_factor = 0.618
         self.epsilon = 1
         self.max_epsilon = 1
         self.min_epsilon = 0.01
         self.decay = 0.001
 
-        self.board_dict = {}
-        self.lastID = None
-
     def choice(self, env) -> int:
         """
         Given the environment, choose the action to take
@@ -32,40 +32,34 @@ class QAgent:
         # Choosing an action given the states based on a random number
         exp_exp_tradeoff = np.random.uniform(0, 1)
 
-        if repr(env.observation) not in self.board_dict:
-            if self.lastID:
-                self.lastID += 1
-            else:
-                self.lastID = 0
-            self.board_dict[repr(env.observation)] = self.lastID
-            state = self.lastID
-        else:
-            state = self.board_dict[repr(env.observation)]
+        state = env.state_index
         # STEP 2: FIRST option for choosing the initial action - exploit
         # If the random number is larger than epsilon: employing exploitation
         # and selecting best action
+        mask = env.action_mask
         if exp_exp_tradeoff > self.epsilon:
-            action = np.argmax(self.Q[state, :])
-            # Sometimes the agent will try to exploit, but end up choosing a not valid move
-            # To ensure that exploiting always provides good results, there's a check to verify if the
-            # action is valid, if it is not, chooses a random valid move
-            possible_moves = env.game.get_possible_moves(1, only_valid=True)
-            if action not in possible_moves:
-                i_random = np.random.randint(len(possible_moves))
-                action = possible_moves[i_random]
+            # the argmax is taken over the valid actions only, so exploiting never picks a not valid move
+            action = self.learner.greedy(state, mask)
 
         # STEP 2: SECOND option for choosing the initial action - explore
         # Otherwise, employing exploration: choosing a random action
         else:
-            possible_moves = env.game.get_possible_moves(1, only_valid=True)
+            possible_moves = np.flatnonzero(mask)
             i_random = np.random.randint(len(possible_moves))
-            action = possible_moves[i_random]
+            action = int(possible_moves[i_random])
 
         return action
 
+    @property
+    def Q(self) -> np.array:
+        """
+        The Q-table of the learner, indexed by [state_index, action]
+        """
+        return self.learner.Q
+
     def update(self, obs, reward: int, done: bool, info: dict, env) -> None:
         """
-        Updates the Q-table after performing an action
+        Stores the transition, and updates the Q-table with every transition of the episode when it ends
 
         :param obs: New state that resulted from a action
         :param reward: The reward returned from applying a action to a state
@@ -73,19 +67,14 @@ class QAgent:
         :param info: Additional info from performing an action
         :param env: The environment
         """
-        if repr(obs) not in self.board_dict:
-            if not self.board_dict:
-                self.board_dict[repr(obs)] = 0
-                self.lastID = 0
-            else:
-                self.lastID += 1
-                self.board_dict[repr(obs)] = self.lastID
-
-        state = self.board_dict[repr(info["old_state"])]
-        new_state = self.board_dict[repr(obs)]
-        action = info['action']
-
-        self.Q[state, action] = self.Q[state, action] + self.alpha * (reward + self.discount_factor * np.max(self.Q[new_state, :]) - self.Q[state, action])
+        # only a finished game has no value, an episode cut by max_turns still bootstraps
+        self.transitions.append((info['old_state_index'], info['action'], reward, env.state_index,
+                                 done and env.game.game_over, info['action_mask']))
+        if done:
+            states, actions, rewards, new_states, dones, masks = zip(*self.transitions)
+            self.learner.update(np.array(states), np.array(actions), np.array(rewards), np.array(new_states),
+                                np.array(dones), next_masks=np.array(masks))
+            self.transitions = []
 
     def episode_update(self, episode: int) -> None:
         """
@@ -11,10 +11,9 @@ class RandomAgent:
         :param env: A Game environment
         :return: the action to take
         """
-        player = env.game.current_player
-        possible_moves = env.game.get_possible_moves(player, only_valid=True)
+        possible_moves = np.flatnonzero(env.action_mask)
         i_random = np.random.randint(len(possible_moves))
-        return possible_moves[i_random]
+        return int(possible_moves[i_random])
 
     def update(self, obs, reward, done, info, env):
         """
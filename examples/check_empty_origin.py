@@ -0,0 +1,25 @@
+"""
+Regression check: a move from an empty square is rejected by every engine.
+
+The numpy engines used to "move" the 0 of an empty origin and report an empty line through the destination as a win.
+    python examples/check_empty_origin.py
+"""
+import numpy as np
+
+from gym_neutreeko.game.engine.bitboard import BitboardEasyGame, BitboardGame
+from gym_neutreeko.game.engine.gamelogic import NeutreekoEasyGame, NeutreekoGame
+
+for game_class in (NeutreekoEasyGame, NeutreekoGame, BitboardEasyGame, BitboardGame):
+    game = game_class()
+    game.reset()
+    empty = tuple(np.argwhere(game.board == 0)[0])
+    assert all(game.action_handler(empty, direction) is None for direction in ('UP', 'DOWN', 'LEFT', 'RIGHT')), \
+        f"{game_class.__name__} moved an empty square"
+    assert not game.game_over and game.turns_count == 0, f"{game_class.__name__} changed its state"
+
+# the middle of the starting board is empty, and its row was reported as a win
+game = NeutreekoGame()
+game.reset()
+assert game.action_handler((2, 2), 'LEFT') is None and not game.game_over, "NeutreekoGame won from an empty square"
+
+print("ok")
@@ -36,7 +36,6 @@ for episode in range(1, NB_EPISODES + 1):
     # Adding the total reward and reduced epsilon values
     training_rewards.append(total_training_rewards)
     # epsilons.append(agent.epsilon)
-# print(f'Highest board id -> {agent.lastID}')
 # print(f'Q-table -> {agent.Q}')
 env.close()
 
@@ -1,6 +1,58 @@
-from gym.envs.registration import register
+"""
+Neutreeko environments for gym.
 
-register(
-    id='neutreeko-v0',
-    entry_point='gym_neutreeko.envs:NeutreekoEnv',
-)
+Importing the package doesn't import gym: neutreeko-v0 is registered right away if gym is already imported,
+and otherwise as soon as gym is, so gym.make('neutreeko-v0') works whatever the import order.
+The engines alone are in gym_neutreeko.core, which needs neither gym nor the environments.
+"""
+import sys
+
+ENV_ID = 'neutreeko-v0'
+
+_registered = False
+
+
+def register_envs() -> None:
+    """
+    Registers the environments with gym, once
+    """
+    global _registered
+    if _registered:
+        return
+    from gym.envs.registration import register
+
+    register(
+        id=ENV_ID,
+        entry_point='gym_neutreeko.envs:NeutreekoEnv',
+    )
+    _registered = True
+
+
+class _RegisterOnImport:
+    """
+    Import hook calling register_envs once gym.envs, and its registry, is imported.
+    A finder of sys.meta_path only needs find_spec, and importlib is only imported with gym
+    """
+    def find_spec(self, fullname, path, target=None):
+        if fullname != 'gym.envs':
+            return None
+        import importlib.util
+
+        # the other finders locate the module, this one only wraps its loader
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(fullname)
+        if spec is None or not hasattr(spec.loader, 'exec_module'):
+            return spec
+        exec_module = spec.loader.exec_module
+
+        def exec_and_register(module):
+            exec_module(module)
+            register_envs()
+        spec.loader.exec_module = exec_and_register
+        return spec
+
+
+if 'gym.envs' in sys.modules:
+    register_envs()
+else:
+    sys.meta_path.insert(0, _RegisterOnImport())
@@ -0,0 +1,285 @@
+"""
+Opening book of the full game.
+
+Every NeutreekoEnv game starts from the same board, so the first plies are the same few positions over and over.
+The book keeps, for the positions of the first max_ply plies, the moves played from them with their number of
+games and mean score for the player to move (1 for a win, 0.5 for a draw, 0 for a loss).
+
+Positions are keyed by their canonical index (symmetry.canonical_full) and moves by their action on the canonical
+board, so the 8 symmetric images of a position share their entries. The entries are sorted by key, and a lookup
+is a binary search. Positions later than max_ply are rejected from the turns count alone, before any hashing.
+
+The book is built offline by BookBuilder, from self-play games, search or tablebase output:
+    python -m gym_neutreeko.book book.npz --tablebase <directory> [--depth 4]
+    python -m gym_neutreeko.book book.npz --self-play examples.MCTSAgent:MCTSAgent [--games 1000] [--max-ply 12]
+"""
+import argparse
+import json
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from gym_neutreeko.game.common import actions
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import symmetry
+from gym_neutreeko.game.common import tables
+
+BOOK_DTYPE = np.dtype([
+    # canonical state index, in [0, 7084000)
+    ('key', np.int32),
+    # action on the canonical board, piece * 8 + direction
+    ('action', np.int8),
+    ('games', np.int32),
+    # mean result for the player to move, 1 win, 0.5 draw, 0 loss
+    ('score', np.float32),
+])
+
+
+def canonical_key(white: int, black: int, player: int) -> Tuple[int, int]:
+    """
+    Key of a position in the book
+
+    :return: The canonical index and the transform from the position to the canonical board
+    """
+    return symmetry.canonical_full(white, black, player)
+
+
+class OpeningBook:
+    """
+    Sorted array of BOOK_DTYPE entries, looked up by binary search
+    """
+    def __init__(self, entries: np.array, max_ply: int):
+        """
+        :param entries: BOOK_DTYPE entries sorted by key
+        :param max_ply: Turns count of the last positions in the book
+        """
+        self.entries = entries
+        self.keys = entries['key']
+        self.max_ply = max_ply
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def load(cls, path: str) -> 'OpeningBook':
+        """
+        Reads a book written by save
+        """
+        with np.load(path) as data:
+            return cls(data['entries'], int(data['max_ply']))
+
+    def save(self, path: str) -> None:
+        """
+        Writes the book as a .npz file
+        """
+        np.savez(path, entries=self.entries, max_ply=self.max_ply)
+
+    def lookup(self, key: int) -> np.array:
+        """
+        Entries of a position
+
+        :param key: A canonical state index, see canonical_key
+        :return: A view of the entries of the position, empty if it isn't in the book
+        """
+        start = np.searchsorted(self.keys, key, 'left')
+        end = np.searchsorted(self.keys, key, 'right')
+        return self.entries[start:end]
+
+    def moves(self, pieces: List[int], player: int) -> List[Tuple[int, int, float]]:
+        """
+        Moves of the book in a position, mapped back from the canonical board
+
+        :param pieces: Bitboards indexed by player value, as BitboardGame.pieces
+        :param player: The player to move
+        :return: A list of (action, games, score), the action as taken by NeutreekoEnv.step
+        """
+        key, transform = canonical_key(pieces[const.WHITE], pieces[const.BLACK], player)
+        return [(symmetry.from_canonical_action(pieces[player], int(entry['action']), transform, 8),
+                 int(entry['games']), float(entry['score'])) for entry in self.lookup(key)]
+
+    def best_move(self, pieces: List[int], player: int, turns: int = 0, min_games: int = 1) -> Union[None, int]:
+        """
+        Move of the book with the best score, the most played one between equal scores
+
+        :param pieces: Bitboards indexed by player value, as BitboardGame.pieces
+        :param player: The player to move
+        :param turns: Turns count of the position, the book isn't searched past max_ply
+        :param min_games: Ignore the moves played fewer times
+        :return: The action taken by NeutreekoEnv.step, None if the position isn't in the book
+        """
+        if turns > self.max_ply:
+            return None
+        best = None
+        best_key = None
+        for action, games, score in self.moves(pieces, player):
+            if games >= min_games and (best_key is None or (score, games) > best_key):
+                best, best_key = action, (score, games)
+        return best
+
+    def choice(self, env, min_games: int = 1) -> Union[None, int]:
+        """
+        First check of an agent before searching
+
+        :param env: A NeutreekoEnv
+        :param min_games: Ignore the moves played fewer times
+        :return: The action of the book, None to search
+        """
+        game = env.game
+        if game.turns_count > self.max_ply:
+            return None
+        board = game.board
+        pieces = [0, tables.board_to_bits(board, const.WHITE), tables.board_to_bits(board, const.BLACK)]
+        return self.best_move(pieces, game.current_player, game.turns_count, min_games)
+
+
+class BookBuilder:
+    """
+    Accumulates the games and score of (position, move) pairs, then sorts them into an OpeningBook
+    """
+    def __init__(self, max_ply: int = 12):
+        """
+        :param max_ply: Only the positions of the first max_ply plies are kept
+        """
+        self.max_ply = max_ply
+        # (key, canonical action) -> [games, total score]
+        self.stats = {}
+
+    def add(self, pieces: List[int], player: int, action: int, score: float, games: int = 1) -> None:
+        """
+        Records a move played in a position
+
+        :param pieces: Bitboards indexed by player value
+        :param player: The player to move
+        :param action: The action, piece * 8 + direction
+        :param score: Result for the player to move, 1 win, 0.5 draw, 0 loss
+        :param games: Weight of the record
+        """
+        key, transform = canonical_key(pieces[const.WHITE], pieces[const.BLACK], player)
+        stat = self.stats.setdefault((key, symmetry.to_canonical_action(pieces[player], action, transform, 8)), [0, 0.0])
+        stat[0] += games
+        stat[1] += score * games
+
+    def add_game(self, game_actions: List[int], winner: int) -> None:
+        """
+        Records the first max_ply moves of a game played from the starting board
+
+        :param game_actions: The actions of the game, as taken by NeutreekoEnv.step
+        :param winner: The player who made 3 in a row, 0 for a draw or an unfinished game
+        """
+        from gym_neutreeko.game.engine.bitboard import BitboardGame
+
+        game = BitboardGame()
+        game.reset()
+        for action in game_actions[:self.max_ply + 1]:
+            player = game.current_player
+            score = 0.5 if not winner else float(winner == player)
+            self.add(game.pieces, player, action, score)
+            if not game.action_handler(*actions.to_move(game.pieces[player], action)):
+                raise ValueError(f"Invalid action {action} at turn {game.turns_count}")
+            if game.game_over:
+                break
+
+    def add_tablebase(self, tablebase, depth: int = 4) -> None:
+        """
+        Records the optimal move of every position reachable in depth plies, scored by its value
+
+        :param tablebase: A tablebase.Tablebase
+        :param depth: Plies explored from the starting board, at most max_ply
+        """
+        from gym_neutreeko.game.engine.bitboard import BitboardGame
+        from gym_neutreeko.tablebase.const import DRAW, WIN
+
+        frontier = [BitboardGame.new_pieces()]
+        player = const.BLACK
+        seen = set()
+        for _ in range(min(depth, self.max_ply) + 1):
+            following = []
+            for pieces in frontier:
+                key, _ = canonical_key(pieces[const.WHITE], pieces[const.BLACK], player)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if self.has_line(pieces):
+                    continue
+                board = tables.bits_to_board(pieces)
+                action = tablebase.best_move(board, player)
+                if action is None:
+                    continue
+                value = tablebase.value(board, player)
+                self.add(pieces, player, action, 1.0 if value == WIN else 0.5 if value == DRAW else 0.0)
+                other = const.WHITE if player == const.BLACK else const.BLACK
+                for _, square, destination in tablebase.moves(pieces[player], pieces[other]):
+                    child = list(pieces)
+                    child[player] ^= tables.SQUARE_BIT[square] | tables.SQUARE_BIT[destination]
+                    following.append(child)
+            frontier = following
+            player = const.WHITE if player == const.BLACK else const.BLACK
+
+    @staticmethod
+    def has_line(pieces: List[int]) -> bool:
+        """
+        True if a player has 3 in a row, the game is over
+        """
+        return any(bits & mask == mask for bits in pieces[1:] for mask in tables.WIN_MASKS)
+
+    def build(self) -> OpeningBook:
+        """
+        Sorts the records into a book
+        """
+        entries = np.zeros(len(self.stats), dtype=BOOK_DTYPE)
+        for i, ((key, action), (games, total)) in enumerate(self.stats.items()):
+            entries[i] = key, action, games, total / games
+        entries = entries[np.lexsort((entries['action'], entries['key']))]
+        return OpeningBook(entries, self.max_ply)
+
+
+def self_play(agent, nb_games: int, max_ply: int) -> BookBuilder:
+    """
+    Plays an agent against itself and records the openings
+
+    :param agent: An object with choice(env), as the example agents
+    :param nb_games: Number of games
+    :param max_ply: Plies kept by the book
+    """
+    from gym_neutreeko.envs import NeutreekoEnv
+
+    builder = BookBuilder(max_ply)
+    env = NeutreekoEnv()
+    for _ in range(nb_games):
+        env.reset()
+        game_actions = []
+        done = False
+        info = {}
+        while not done:
+            action = agent.choice(env)
+            game_actions.append(action)
+            _, _, done, info = env.step(action)
+        winner = info['player'] if env.game.game_over and not env.game.draw else 0
+        builder.add_game(game_actions, winner)
+    return builder
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds an opening book of the full game')
+    parser.add_argument('output', help='.npz file of the book')
+    parser.add_argument('--tablebase', default=None, help='directory of a tablebase, for the optimal moves')
+    parser.add_argument('--depth', type=int, default=4, help='plies explored with the tablebase (default: 4)')
+    parser.add_argument('--self-play', default=None, help='agent playing against itself, as module:Class')
+    parser.add_argument('--agent-kwargs', default='{}', help='JSON arguments of the agent constructor')
+    parser.add_argument('--games', type=int, default=1000, help='number of self-play games (default: 1000)')
+    parser.add_argument('--max-ply', type=int, default=12, help='plies kept by the book (default: 12)')
+    args = parser.parse_args()
+
+    if args.self_play:
+        from gym_neutreeko.run import load_agent
+
+        book_builder = self_play(load_agent(args.self_play, json.loads(args.agent_kwargs)), args.games, args.max_ply)
+    else:
+        book_builder = BookBuilder(args.max_ply)
+    if args.tablebase:
+        from gym_neutreeko.tablebase import Tablebase
+
+        book_builder.add_tablebase(Tablebase(args.tablebase), args.depth)
+    book = book_builder.build()
+    book.save(args.output)
+    print(f"{len(book)} entries, {len(np.unique(book.keys))} positions")
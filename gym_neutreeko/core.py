@@ -0,0 +1,9 @@
+"""
+The game engines without gym, for the workers and tools that only play games.
+Importing this module loads NumPy and the precomputed tables, but not gym nor the environments
+"""
+from gym_neutreeko.game.common import actions
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common.state import GameState
+from gym_neutreeko.game.engine.bitboard import BitboardEasyGame, BitboardGame
+from gym_neutreeko.game.engine.gamelogic import NeutreekoEasyGame, NeutreekoGame
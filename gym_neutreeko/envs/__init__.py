@@ -1,2 +1,7 @@
 from gym_neutreeko.envs.neutreeko_env import NeutreekoEnv
 from gym_neutreeko.envs.neutreeko_easy_env import NeutreekoEasyEnv
+from gym_neutreeko.envs.neutreeko_vector_env import NeutreekoVectorEnv
+
+from gym_neutreeko import register_envs
+
+register_envs()
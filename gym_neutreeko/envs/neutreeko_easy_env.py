@@ -1,28 +1,17 @@
-from typing import Tuple
+from typing import List, Tuple
 
 import gym
-from gym import error, spaces, utils, logger
-from gym.utils import seeding
+from gym_neutreeko.game.common import actions
+from gym_neutreeko.game.common import ranking
+from gym_neutreeko.game.common import symmetry
+from gym_neutreeko.game.common import tables
+from gym_neutreeko.game.common.gameutils import Reward
 
 import numpy as np
 
+from gym_neutreeko.game.engine import movegen
 from gym_neutreeko.game.engine.gamelogic import NeutreekoEasyGame
-
-
-class Reward:
-    @staticmethod
-    def get(move_type):
-        """
-        Chooses a reward value based on the type of action
-        :param move_type: type of action
-        :return: the reward value
-        """
-        return {
-            "win": 20,  # winning move
-            # "2_row": 5,  # places 2 pieces together
-            # "between": 2,  # gets in between 2 opponent pieces
-            "default": -1  # makes a move (negative to not enforce unnecessary moves)
-        }.get(move_type, -1)
+from gym_neutreeko.game.engine.bitboard import BitboardEasyGame
 
 
 class NeutreekoEasyEnv(gym.Env):
@@ -44,7 +33,11 @@ class NeutreekoEasyEnv(gym.Env):
          [0, 0, 1, 0, 0],
          [0, 0, 0, 0, 0]]
 
-       All possible board combinations
+       All possible board combinations. step returns the board, state_index maps it
+       to its index in [0, 2300) and board_from_index does the opposite
+       With observe_mask=True, observations are dicts {'observation': board, 'action_mask': action_mask}
+       With copy_observation=False, observations are read-only views of the game board instead of copies,
+       valid until the next step, and observe(out) copies the board into a preallocated array
     Actions:
        Type: Discrete(12)
 
@@ -68,6 +61,7 @@ class NeutreekoEasyEnv(gym.Env):
        2  8     9     10    11
 
        The piece 0 is the one with the lowest index. For a piece in coords (x, y), its index is 5*x + y.
+       action_mask tells which actions are valid, and is also returned in info after each step
     Reward:
        Reward class
     Starting State:
@@ -80,17 +74,40 @@ class NeutreekoEasyEnv(gym.Env):
         'render.modes': ['terminal']
     }
 
-    def __init__(self, render_mode='terminal', max_turns=200):
+    def __init__(self, render_mode='terminal', max_turns=200, bitboard=False, observe_mask=False,
+                 copy_observation=True, seed=None):
         super(NeutreekoEasyEnv, self).__init__()
 
         # 3 pieces and 4 directions possible
-        self.action_space = gym.spaces.Discrete(3*4)
-        self.observation_space = gym.spaces.Discrete(2300)
+        self.action_space = gym.spaces.Discrete(actions.NB_EASY_ACTIONS)
+        self.observation_space = gym.spaces.Discrete(ranking.NB_EASY_STATES)
+
+        # observations become dicts with the board and the mask of the valid actions
+        self.observe_mask = observe_mask
+        if observe_mask:
+            self.observation_space = gym.spaces.Dict({
+                'observation': self.observation_space,
+                'action_mask': gym.spaces.MultiBinary(actions.NB_EASY_ACTIONS),
+            })
+        self._mask = None
+        self._mask_hash = None
+
+        # False: observations are read-only views of the game board instead of copies, see observe
+        self.copy_observation = copy_observation
+        self._view = None
+        self._view_source = None
+        # board before the last step, reused by info['old_state'] when the observations aren't copied
+        self._old_state = np.zeros((5, 5), dtype=np.int8)
+        self._old_state_view = self._old_state.view()
+        self._old_state_view.setflags(write=False)
 
         self.render_mode = render_mode
         self.max_turns = max_turns
 
-        self.game = NeutreekoEasyGame()
+        # the bitboard engine has the same API, but is much faster on step-heavy workloads
+        self.game = BitboardEasyGame() if bitboard else NeutreekoEasyGame()
+        self.np_random = None
+        self.seed(seed)
         pass
 
     def step(self, action: int) -> Tuple[object, float, bool, dict]:
@@ -100,8 +117,14 @@ class NeutreekoEasyEnv(gym.Env):
         :return: observation, reward, done, info
         """
         reward = 0
+        if self.copy_observation:
+            old_state = np.copy(self.game.board)
+        else:
+            np.copyto(self._old_state, self.game.board)
+            old_state = self._old_state_view
         info = {
-            'old_state': np.copy(self.game.board),
+            'old_state': old_state,
+            'old_state_index': self.game.state_index,
             'turn': self.game.turns_count,
             'action': action,
             'direction': None,
@@ -119,15 +142,32 @@ class NeutreekoEasyEnv(gym.Env):
             reward = Reward.get(move_type)
             info['direction'] = dir
             info['new_position'] = new_pos
+        info['action_mask'] = self.action_mask
 
         return self.observation, reward, self.done, info
 
-    def reset(self) -> None:
+    def reset(self, seed=None) -> None:
         """
         Resets the game
+        :param seed: Reseeds the environment first if not None, see seed
         """
+        if seed is not None:
+            self.seed(seed)
         self.game.reset()
 
+    def seed(self, seed=None) -> List[int]:
+        """
+        Seeds the random generator of the environment, which draws the starting boards.
+        Parallel environments should get the children of one SeedSequence(root).spawn(n), so their streams are
+        independent and the whole run is reproduced from the root seed
+        :param seed: An int, a np.random.SeedSequence or None for fresh entropy
+        :return: The entropy of the seed sequence
+        """
+        sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.np_random = np.random.default_rng(sequence)
+        self.game.rng = self.np_random
+        return [sequence.entropy]
+
     def render(self, mode='terminal') -> None:
         """
         Renders the game according to the mode
@@ -156,10 +196,34 @@ class NeutreekoEasyEnv(gym.Env):
     @property
     def observation(self) -> np.array:
         """
-        Returns the game board
-        :return: The board as a numpy array
+        Returns the game board, with the action mask if observe_mask is set
+        :return: The board as a numpy array, or a dict with the board and the action mask
+        """
+        board = np.copy(self.game.board) if self.copy_observation else self.observe()
+        if self.observe_mask:
+            return {'observation': board, 'action_mask': self.action_mask}
+        return board
+
+    def observe(self, out: np.array = None) -> np.array:
+        """
+        Returns the game board without allocating a new one
+        :param out: A (5, 5) int8 array the board is copied into, as a slot of a replay buffer
+        :return: out, or a read-only view of the game board if out is None,
+            which is only valid until the next step or reset
         """
-        return np.copy(self.game.board)
+        board = self.game.board
+        if out is not None:
+            np.copyto(out, board)
+            return out
+        # the bitboard engine already returns a read-only board
+        if not board.flags.writeable:
+            return board
+        # the board can itself be a view (a reshape), so the cache keeps the array it was made from
+        if self._view_source is not board:
+            self._view = board.view()
+            self._view.setflags(write=False)
+            self._view_source = board
+        return self._view
 
     def process(self, action: int) -> Tuple[tuple, str]:
         """
@@ -167,7 +231,44 @@ class NeutreekoEasyEnv(gym.Env):
         :param action: A integer between 0 and 11 representing an action
         :return: A tuple with a position (tuple) and a direction
         """
-        directions = ['UP', 'DOWN', 'LEFT', 'RIGHT']
-        result = np.where(self.game.board == 1)
-        list_of_coordinates = list(zip(result[0], result[1]))
-        return list_of_coordinates[action // 4], directions[action % 4]
+        return actions.to_move(self.game.player_bits(1), action, len(tables.EASY_DIRECTIONS))
+
+    @property
+    def action_mask(self) -> np.array:
+        """
+        Returns which actions are valid.
+        It is generated once per position, keyed by the game hash, so step, info and the agents share it
+        :return: A read-only boolean numpy array of size 12
+        """
+        if self._mask_hash != self.game.hash:
+            mask = np.zeros(actions.NB_EASY_ACTIONS, dtype=bool)
+            mask[self.game.legal_moves()[:, movegen.ACTION]] = True
+            mask.setflags(write=False)
+            self._mask, self._mask_hash = mask, self.game.hash
+        return self._mask
+
+    @property
+    def state_index(self) -> int:
+        """
+        Returns the index of the game board in the observation space
+        :return: An int between 0 and 2299
+        """
+        return self.game.state_index
+
+    @staticmethod
+    def board_from_index(index: int) -> np.array:
+        """
+        Inverse of state_index
+        :param index: An int between 0 and 2299
+        :return: The board as a numpy array
+        """
+        return ranking.easy_board(index)
+
+    @property
+    def canonical_state(self) -> Tuple[int, int]:
+        """
+        Returns the index of the canonical board among its 8 symmetries, and the transform from the game board to it.
+        Actions are mapped with symmetry.to_canonical_action and symmetry.from_canonical_action
+        :return: An int between 0 and 2299 and the index of the transform
+        """
+        return symmetry.canonical_easy(self.game.player_bits(1))
@@ -1,13 +1,17 @@
-from typing import Tuple
+from typing import List, Tuple
 
 import gym
-from gym import error, spaces, utils, logger
-from gym.utils import seeding
+from gym_neutreeko.game.common import actions
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import ranking
+from gym_neutreeko.game.common import symmetry
 from gym_neutreeko.game.common.gameutils import Reward
 
 import numpy as np
 
+from gym_neutreeko.game.engine import movegen
 from gym_neutreeko.game.engine.gamelogic import NeutreekoGame
+from gym_neutreeko.game.engine.bitboard import BitboardGame
 
 
 class NeutreekoEnv(gym.Env):
@@ -32,16 +36,20 @@ class NeutreekoEnv(gym.Env):
 
        Num     Observation               Min                     Max
        5,5     Board                     0                       2
+
+       state_index maps the board and the player to move to an index in [0, 7084000)
+       and board_from_index does the opposite
+       With observe_mask=True, observations are dicts {'observation': board, 'action_mask': action_mask}
+       With copy_observation=False, observations are read-only views of the game board instead of copies,
+       valid until the next step, and observe(out) copies the board into a preallocated array
     Actions:
-        TODO Ainda não tenho a certeza como ficarão as ações
-       Type: Discrete(2)
+       Type: Discrete(24)
        Num   Action
-       0     Push cart to the left
-       1     Push cart to the right
-       Note: The amount the velocity that is reduced or increased is not
-       fixed; it depends on the angle the pole is pointing. This is because
-       the center of gravity of the pole increases the amount of energy needed
-       to move the cart underneath it
+       8*p+d Move the piece p of the player to move in the direction d
+
+       The pieces are numbered 0 to 2 in increasing 5*x + y order and the directions follow ACTIONS_DICT
+       (UP, DOWN, LEFT, RIGHT, UP_LEFT, UP_RIGHT, DOWN_LEFT, DOWN_RIGHT), see game.common.actions.
+       action_mask tells which actions are valid, and is also returned in info after each step
     Reward:
         TODO Rewards ainda vão ser definidas
        Reward is 1 for every step taken, including the termination step
@@ -60,17 +68,36 @@ class NeutreekoEnv(gym.Env):
         'render.modes': ['terminal']
     }
 
-    def __init__(self, render_mode='terminal', max_turns=200):
+    def __init__(self, render_mode='terminal', max_turns=200, bitboard=False, observe_mask=False,
+                 copy_observation=True, seed=None):
         super(NeutreekoEnv, self).__init__()
 
         # 3 pieces and 8 directions possible
-        self.action_space = gym.spaces.Discrete(8*3)
+        self.action_space = gym.spaces.Discrete(actions.NB_ACTIONS)
         self.observation_space = gym.spaces.Box(low=np.int8(0), high=np.int8(2), shape=(5, 5), dtype=np.int8)
 
+        # observations become dicts with the board and the mask of the valid actions
+        self.observe_mask = observe_mask
+        if observe_mask:
+            self.observation_space = gym.spaces.Dict({
+                'observation': self.observation_space,
+                'action_mask': gym.spaces.MultiBinary(actions.NB_ACTIONS),
+            })
+        self._mask = None
+        self._mask_hash = None
+
+        # False: observations are read-only views of the game board instead of copies, see observe
+        self.copy_observation = copy_observation
+        self._view = None
+        self._view_source = None
+
         self.render_mode = render_mode
         self.max_turns = max_turns
 
-        self.game = NeutreekoGame()
+        # the bitboard engine has the same API, but is much faster on step-heavy workloads
+        self.game = BitboardGame() if bitboard else NeutreekoGame()
+        self.np_random = None
+        self.seed(seed)
         pass
 
     def step(self, action) -> Tuple[object, float, bool, dict]:
@@ -78,7 +105,7 @@ class NeutreekoEnv(gym.Env):
         implementation of the classic “agent-environment loop”.
 
         Args:
-           action (object) : the board
+           action (int) : piece * 8 + direction, or a tuple (position, direction) as returned by get_possible_moves
         Returns:
            observation (object):
            reward (float)
@@ -94,7 +121,8 @@ class NeutreekoEnv(gym.Env):
             'turn': self.game.turns_count,
             'direction': None,
             'player': self.game.current_player,
-            'player_name': ['white', 'black'][self.game.current_player - 1]
+            'player_name': ['white', 'black'][self.game.current_player - 1],
+            'action': action,
         }
 
         assert not self.done
@@ -102,7 +130,10 @@ class NeutreekoEnv(gym.Env):
         #     logger.warn("You are calling 'step()' even though this environment has already returned done = True."
         #                 "You should always call 'reset()' once you receive 'done = True'"
         #                 "-- any further steps are undefined behavior.")
-        pos, dir = action
+        if isinstance(action, tuple):
+            pos, dir = action
+        else:
+            pos, dir = actions.to_move(self.game.player_bits(self.game.current_player), action)
         move_check = self.game.action_handler(pos, dir)
 
         if move_check:
@@ -110,13 +141,30 @@ class NeutreekoEnv(gym.Env):
             reward = Reward.method_1(move_type)
             info['direction'] = move_dir
             info['new_position'] = new_pos
+        # valid actions of the player to move next
+        info['action_mask'] = self.action_mask
 
         return self.observation, reward, self.done, info
 
-    def reset(self):
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed(seed)
         self.game.reset()
         pass
 
+    def seed(self, seed=None) -> List[int]:
+        """
+        Seeds the random generator of the environment, available to the agents as np_random.
+        The starting board of the full game is fixed.
+        Parallel environments should get the children of one SeedSequence(root).spawn(n), so their streams are
+        independent and the whole run is reproduced from the root seed
+        :param seed: An int, a np.random.SeedSequence or None for fresh entropy
+        :return: The entropy of the seed sequence
+        """
+        sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.np_random = np.random.default_rng(sequence)
+        return [sequence.entropy]
+
     def render(self, mode='terminal'):
         if mode == 'terminal':
             self.game.render()
@@ -133,4 +181,69 @@ class NeutreekoEnv(gym.Env):
 
     @property
     def observation(self):
-        return np.copy(self.game.board)
+        board = np.copy(self.game.board) if self.copy_observation else self.observe()
+        if self.observe_mask:
+            return {'observation': board, 'action_mask': self.action_mask}
+        return board
+
+    def observe(self, out: np.array = None) -> np.array:
+        """
+        Returns the game board without allocating a new one
+        :param out: A (5, 5) int8 array the board is copied into, as a slot of a replay buffer
+        :return: out, or a read-only view of the game board if out is None,
+            which is only valid until the next step or reset
+        """
+        board = self.game.board
+        if out is not None:
+            np.copyto(out, board)
+            return out
+        # the bitboard engine already returns a read-only board
+        if not board.flags.writeable:
+            return board
+        # the board can itself be a view (a reshape), so the cache keeps the array it was made from
+        if self._view_source is not board:
+            self._view = board.view()
+            self._view.setflags(write=False)
+            self._view_source = board
+        return self._view
+
+    @property
+    def action_mask(self) -> np.array:
+        """
+        Returns which actions are valid for the player to move.
+        It is generated once per position, keyed by the game hash, so step, info and the agents share it
+        :return: A read-only boolean numpy array of size 24
+        """
+        if self._mask_hash != self.game.hash:
+            mask = np.zeros(actions.NB_ACTIONS, dtype=bool)
+            mask[self.game.legal_moves()[:, movegen.ACTION]] = True
+            mask.setflags(write=False)
+            self._mask, self._mask_hash = mask, self.game.hash
+        return self._mask
+
+    @property
+    def state_index(self) -> int:
+        """
+        Returns the index of the game board and player to move, see ranking.full_index
+        :return: An int between 0 and 7083999
+        """
+        return self.game.state_index
+
+    @staticmethod
+    def board_from_index(index: int) -> Tuple[np.array, int]:
+        """
+        Inverse of state_index
+        :param index: An int between 0 and 7083999
+        :return: The board as a numpy array and the player to move
+        """
+        return ranking.full_board(index)
+
+    @property
+    def canonical_state(self) -> Tuple[int, int]:
+        """
+        Returns the index of the canonical board among its 8 symmetries, and the transform from the game board to it.
+        Moves are mapped with symmetry.transform_move
+        :return: An int between 0 and 7083999 and the index of the transform
+        """
+        return symmetry.canonical_full(self.game.player_bits(const.WHITE), self.game.player_bits(const.BLACK),
+                                       self.game.current_player)
@@ -0,0 +1,169 @@
+from typing import Tuple
+
+import gym
+import numpy as np
+
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import ranking
+from gym_neutreeko.game.common import tables
+from gym_neutreeko.game.common.gameutils import Reward
+from gym_neutreeko.game.engine.gamelogic import NeutreekoGame
+
+
+class NeutreekoVectorEnv(gym.Env):
+    """
+    Description:
+       Steps N games of Neutreeko (or of the easy version) at once.
+       The boards are kept in a single (N, 5, 5) int8 tensor and every step
+       slides the N chosen pieces, checks the N wins and resets the finished games
+       with NumPy operations over the whole batch
+    Observation:
+       Type: Box(0, 2, (N, 5, 5), int8)
+
+       The boards of the N games, finished games are already reset
+    Actions:
+       Type: MultiDiscrete([12] * N) for the easy game, MultiDiscrete([24] * N) for the full game
+
+       Action a moves the piece a // D of the current player in the direction a % D,
+       where D is the number of directions (4 or 8, in the order of EASY_ACTIONS_DICT / ACTIONS_DICT).
+       As in NeutreekoEasyEnv, piece 0 is the one with the lowest index 5*x + y.
+       A move that can't be made leaves the game unchanged and gives a reward of 0
+    Reward:
+       Reward class
+    Starting State:
+        A randomly generated board for the easy game, the board of NeutreekoGame.new_board otherwise
+    Episode Termination:
+       The player makes 3 in a row
+       Episode length is greater than max_turns, the game is then reset automatically
+   """
+    metadata = {
+        'render.modes': ['terminal']
+    }
+
+    def __init__(self, num_envs: int, easy: bool = False, max_turns: int = 200, seed=None):
+        super(NeutreekoVectorEnv, self).__init__()
+
+        self.num_envs = num_envs
+        self.easy = easy
+        self.max_turns = max_turns
+        self.nb_directions = len(const.EASY_ACTIONS_DICT) if easy else len(const.ACTIONS_DICT)
+
+        self.single_action_space = gym.spaces.Discrete(3 * self.nb_directions)
+        self.action_space = gym.spaces.MultiDiscrete([3 * self.nb_directions] * num_envs)
+        self.observation_space = gym.spaces.Box(low=np.int8(0), high=np.int8(2), shape=(num_envs, 5, 5),
+                                                dtype=np.int8)
+
+        self.rng = np.random.default_rng(seed)
+
+        # flat boards with a sentinel cell that is never free and never belongs to a player,
+        # the padding of tables.RAY_TABLE and tables.LINES_THROUGH_TABLE points to it
+        self.cells = np.zeros((num_envs, tables.NB_SQUARES + 1), dtype=np.int8)
+        self.cells[:, tables.NB_SQUARES] = -1
+        self.boards = self.cells[:, :tables.NB_SQUARES].reshape((num_envs, const.BOARD_SIZE, const.BOARD_SIZE))
+
+        self.current_player = np.zeros(num_envs, dtype=np.int8)
+        self.turns_count = np.zeros(num_envs, dtype=np.int64)
+        self.rows = np.arange(num_envs)
+
+        self.reward_values = np.array([0, Reward.get("default"), Reward.get("win")], dtype=np.float32)
+        pass
+
+    def reset(self) -> np.array:
+        """
+        Resets every game
+        :return: The observation
+        """
+        self.reset_games(self.rows)
+        return self.observation
+
+    def reset_games(self, index: np.array) -> None:
+        """
+        Resets some of the games
+
+        :param index: Array with the indexes of the games to reset
+        """
+        count = len(index)
+        if not count:
+            return
+        if self.easy:
+            # 3 distinct squares per game, in one draw of a state index per game
+            squares = ranking.UNRANK_TABLE[self.rng.integers(ranking.NB_EASY_STATES, size=count)]
+            self.cells[index, :tables.NB_SQUARES] = 0
+            self.cells[index[:, None], squares] = 1
+            self.current_player[index] = 1
+        else:
+            self.cells[index, :tables.NB_SQUARES] = NeutreekoGame.new_board().ravel()
+            self.current_player[index] = const.BLACK
+        self.turns_count[index] = 0
+
+    def step(self, actions: np.array) -> Tuple[np.array, np.array, np.array, dict]:
+        """
+        Performs one action on each game and returns batched info
+        :param actions: Array of N ints
+        :return: observation, reward, done, info
+        """
+        actions = np.asarray(actions)
+        rows = self.rows
+        cells = self.cells
+        player = self.current_player.copy()
+
+        # squares of the current player's pieces, np.nonzero walks each row in increasing order
+        pieces = np.nonzero(cells == player[:, None])[1].reshape((self.num_envs, 3))
+        origin = pieces[rows, actions // self.nb_directions]
+
+        # the piece slides until the first occupied cell of its ray, the sentinel ends every ray
+        ray = tables.RAY_TABLE[origin, actions % self.nb_directions]
+        distance = (cells[rows[:, None], ray] != 0).argmax(axis=1)
+        valid = distance > 0
+        destination = np.where(valid, ray[rows, distance - 1], origin)
+
+        moved = rows[valid]
+        cells[moved, origin[valid]] = 0
+        cells[moved, destination[valid]] = player[valid]
+
+        # only the lines through the destination of the move can have been completed
+        lines = tables.LINES_THROUGH_TABLE[destination]
+        win = valid & (cells[rows[:, None, None], lines] == player[:, None, None]).all(axis=2).any(axis=1)
+
+        reward = self.reward_values[valid.astype(np.intp) + win]
+        info = {
+            'turn': self.turns_count.copy(),
+            'player': player,
+            'valid': valid,
+            'win': win,
+        }
+        self.turns_count += valid
+        if not self.easy:
+            self.current_player[valid] = const.WHITE + const.BLACK - player[valid]
+        done = win | (self.turns_count > self.max_turns)
+
+        finished = np.flatnonzero(done)
+        if len(finished):
+            info['terminal_observation'] = self.boards[finished]
+            info['terminal_index'] = finished
+            self.reset_games(finished)
+
+        return self.observation, reward, done, info
+
+    def render(self, mode='terminal') -> None:
+        """
+        Renders the games according to the mode
+        :param mode: terminal
+        :return:
+        """
+        if mode == 'terminal':
+            print(self.boards)
+
+    def close(self):
+        """
+        Closes the environment and terminates anything if necessary
+        """
+        pass
+
+    @property
+    def observation(self) -> np.array:
+        """
+        Returns the game boards
+        :return: The boards as a (N, 5, 5) numpy array
+        """
+        return np.copy(self.boards)
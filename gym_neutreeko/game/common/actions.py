@@ -0,0 +1,68 @@
+"""
+Integer encoding of the moves, shared by every environment.
+
+An action is piece * nb_directions + direction, where the pieces of the player to move are numbered
+in increasing square order (5*x + y) and the direction indexes the first nb_directions of tables.DIRECTIONS:
+4 for NeutreekoEasyEnv (Discrete(12)) and 8 for NeutreekoEnv (Discrete(24)).
+"""
+from typing import Tuple
+
+from gym_neutreeko.game.common import tables
+
+NB_PIECES = 3
+NB_EASY_ACTIONS = NB_PIECES * len(tables.EASY_DIRECTIONS)
+NB_ACTIONS = NB_PIECES * len(tables.DIRECTIONS)
+
+
+def encode(pieces: int, square: int, direction: int, nb_directions: int = 8) -> int:
+    """
+    Encodes the move of the piece in a square
+
+    :param pieces: Bitboard of the pieces of the player to move
+    :param square: The square index of the moved piece
+    :param direction: The direction index, as in tables.DIRECTIONS
+    :param nb_directions: 4 for the easy game, 8 for the full game
+    :return: The action
+    """
+    # the rank of the piece is the number of pieces on lower squares
+    piece = bin(pieces & (tables.SQUARE_BIT[square] - 1)).count('1')
+    return piece * nb_directions + direction
+
+
+def decode(pieces: int, action: int, nb_directions: int = 8) -> Tuple[int, int]:
+    """
+    Inverse of encode
+
+    :param pieces: Bitboard of the pieces of the player to move
+    :param action: The action
+    :param nb_directions: 4 for the easy game, 8 for the full game
+    :return: The square index of the moved piece and the direction index
+    """
+    piece, direction = divmod(int(action), nb_directions)
+    return tables.bits_to_squares(pieces)[piece], direction
+
+
+def from_move(pieces: int, move: Tuple[tuple, str], nb_directions: int = 8) -> int:
+    """
+    Encodes a move given as a position and a direction name, as returned by get_possible_moves
+
+    :param pieces: Bitboard of the pieces of the player to move
+    :param move: A tuple with the position of the piece and a direction
+    :param nb_directions: 4 for the easy game, 8 for the full game
+    :return: The action
+    """
+    pos, direction = move
+    return encode(pieces, tables.square(pos), tables.DIRECTION_INDEX[direction], nb_directions)
+
+
+def to_move(pieces: int, action: int, nb_directions: int = 8) -> Tuple[tuple, str]:
+    """
+    Decodes an action into the position and direction name taken by the action_handler of the games
+
+    :param pieces: Bitboard of the pieces of the player to move
+    :param action: The action
+    :param nb_directions: 4 for the easy game, 8 for the full game
+    :return: A tuple with the position of the piece and a direction
+    """
+    square, direction = decode(pieces, action, nb_directions)
+    return tables.SQUARE_COORDS[square], tables.DIRECTIONS[direction]
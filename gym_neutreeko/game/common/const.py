@@ -35,5 +35,8 @@ WHITE = 1
 
 BOARD_SIZE = 5
 
+# Occurrences of the same position (board and player to move) that draw the game
+REPETITIONS = 3
+
 BLACK_WIN = numpy.array([BLACK, BLACK, BLACK])
 WHITE_WIN = numpy.array([WHITE, WHITE, WHITE])
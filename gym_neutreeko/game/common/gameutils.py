@@ -3,6 +3,33 @@ from typing import Tuple, Union
 import numpy as np
 
 from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import tables
+
+
+class Reward:
+    @staticmethod
+    def get(move_type):
+        """
+        Chooses a reward value based on the type of action
+        :param move_type: type of action
+        :return: the reward value
+        """
+        return {
+            "win": 20,  # winning move
+            "draw": 0,  # third occurrence of the same position
+            # "2_row": 5,  # places 2 pieces together
+            # "between": 2,  # gets in between 2 opponent pieces
+            "default": -1  # makes a move (negative to not enforce unnecessary moves)
+        }.get(move_type, -1)
+
+    @staticmethod
+    def method_1(move_type):
+        """
+        Reward used by NeutreekoEnv, the same values as get
+        :param move_type: type of action
+        :return: the reward value
+        """
+        return Reward.get(move_type)
 
 
 class NeutreekoUtils:
@@ -38,29 +65,28 @@ class NeutreekoUtils:
     def find_sequence_board(board: np.array, sequence) -> bool:
         """
         Given a board, attempts to find a sequence in all possible directions
+        Checks the 48 lines of tables.LINE_SQUARES in a single fancy-index
+
         :param board:
         :param sequence:
         :return: True if the sequence is in the board, False otherwise
         """
-        for i in range(len(board)):
-            # Check in lines
-            if NeutreekoUtils.search_sequence_numpy(board[i, :], sequence):
-                return True
-            # check in columns
-            if NeutreekoUtils.search_sequence_numpy(board[:, i], sequence):
-                return True
-
-        # check victory in diagonals
-        flipped_board = np.fliplr(board)
-        for i in range(-2, 3):
-            diagonal1 = np.diagonal(board, offset=i)
-            if NeutreekoUtils.search_sequence_numpy(diagonal1, sequence):
-                return True
-            diagonal2 = np.diagonal(flipped_board, offset=i)
-            if NeutreekoUtils.search_sequence_numpy(diagonal2, sequence):
-                return True
-
-        return False
+        return bool((board.ravel()[tables.LINE_SQUARES] == sequence).all(1).any())
+
+    @staticmethod
+    def find_sequence_cell(board: np.array, coords: Tuple[int, int], value: int) -> bool:
+        """
+        Checks if one of the lines going through a cell is filled with value.
+        After a move only the lines through its destination can have changed,
+        so this is enough to know if the move made 3 in a row
+
+        :param board: A np array of size (5,5)
+        :param coords: The x and y coordinates of a spot
+        :param value: the value of the player
+        :return: True if a line through coords has 3 times value, False otherwise
+        """
+        lines = tables.LINE_SQUARES_THROUGH[tables.square(coords)]
+        return bool((board.ravel()[lines] == value).all(1).any())
 
     @staticmethod
     def value_in_board(board, coords: Tuple[int, int]) -> int:
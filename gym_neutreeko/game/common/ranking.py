@@ -0,0 +1,209 @@
+"""
+Perfect hashing of Neutreeko positions with the combinatorial number system.
+
+A set of 3 squares s0 < s1 < s2 is ranked as C(s0, 1) + C(s1, 2) + C(s2, 3), a dense index in [0, C(n, 3))
+when the squares are taken among the first n ones. The easy game has C(25, 3) = 2300 states and the full game,
+with the black pieces ranked among the 22 squares left free by the white ones and the player to move,
+has C(25, 3) * C(22, 3) * 2 = 7084000 states.
+Seen from the player to move, ignoring colours, there are C(25, 3) * C(22, 3) = 3542000 positions.
+"""
+from math import comb
+from typing import Tuple
+
+import numpy as np
+
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import tables
+
+NB_PIECES = 3
+NB_EASY_STATES = comb(tables.NB_SQUARES, NB_PIECES)
+NB_BLACK_PLACEMENTS = comb(tables.NB_SQUARES - NB_PIECES, NB_PIECES)
+NB_POSITIONS = NB_EASY_STATES * NB_BLACK_PLACEMENTS
+NB_FULL_STATES = NB_POSITIONS * 2
+
+# C(n, k) for k in 1..3, indexed by [k - 1][n]
+BINOMIALS = tuple(tuple(comb(n, k) for n in range(tables.NB_SQUARES)) for k in range(1, NB_PIECES + 1))
+
+
+def _build_unrank_table() -> np.array:
+    """
+    Lists every set of 3 squares by rank
+
+    :return: A (2300, 3) array, the row i has the squares of rank i in increasing order
+    """
+    table = np.zeros((NB_EASY_STATES, NB_PIECES), dtype=np.int8)
+    for s2 in range(NB_PIECES - 1, tables.NB_SQUARES):
+        for s1 in range(1, s2):
+            for s0 in range(s1):
+                table[BINOMIALS[0][s0] + BINOMIALS[1][s1] + BINOMIALS[2][s2]] = s0, s1, s2
+    return table
+
+
+# The sets of 3 squares among the first 22 are the first 1540 ranks, so one table serves both colours
+UNRANK_TABLE = _build_unrank_table()
+
+
+def rank_bits(bits: int) -> int:
+    """
+    Ranks a set of 3 squares
+
+    :param bits: A bitboard with 3 bits set
+    :return: The rank, in [0, 2300)
+    """
+    s0 = (bits & -bits).bit_length() - 1
+    bits &= bits - 1
+    s1 = (bits & -bits).bit_length() - 1
+    s2 = (bits & (bits - 1)).bit_length() - 1
+    return BINOMIALS[0][s0] + BINOMIALS[1][s1] + BINOMIALS[2][s2]
+
+
+def unrank_bits(rank: int) -> int:
+    """
+    Inverse of rank_bits
+
+    :param rank: A rank in [0, 2300)
+    :return: The bitboard of the 3 squares
+    """
+    s0, s1, s2 = UNRANK_TABLE[rank]
+    return tables.SQUARE_BIT[s0] | tables.SQUARE_BIT[s1] | tables.SQUARE_BIT[s2]
+
+
+def _compress(black: int, white: int) -> int:
+    """
+    Removes the white squares from the black bitboard, shifting down the squares above them,
+    so that the black pieces are placed among the 22 free squares
+
+    :param black: Bitboard of the black pieces
+    :param white: Bitboard of the white pieces
+    :return: The compressed black bitboard
+    """
+    for square in reversed(tables.bits_to_squares(white)):
+        low = black & (tables.SQUARE_BIT[square] - 1)
+        black = ((black >> 1) & ~(tables.SQUARE_BIT[square] - 1)) | low
+    return black
+
+
+def _expand(black: int, white: int) -> int:
+    """
+    Inverse of _compress
+
+    :param black: The compressed black bitboard
+    :param white: Bitboard of the white pieces
+    :return: The bitboard of the black pieces
+    """
+    for square in tables.bits_to_squares(white):
+        low = black & (tables.SQUARE_BIT[square] - 1)
+        black = ((black & ~(tables.SQUARE_BIT[square] - 1)) << 1) | low
+    return black
+
+
+def easy_index(pieces: int) -> int:
+    """
+    Dense index of a NeutreekoEasyGame state
+
+    :param pieces: Bitboard of the 3 pieces
+    :return: An int in [0, 2300)
+    """
+    return rank_bits(pieces)
+
+
+def easy_pieces(index: int) -> int:
+    """
+    Inverse of easy_index
+
+    :param index: An int in [0, 2300)
+    :return: Bitboard of the 3 pieces
+    """
+    return unrank_bits(index)
+
+
+def position_index(mover: int, other: int) -> int:
+    """
+    Dense index of a position seen from the player to move, whatever its colour
+
+    :param mover: Bitboard of the pieces of the player to move
+    :param other: Bitboard of the pieces of the other player
+    :return: An int in [0, 3542000)
+    """
+    return rank_bits(mover) * NB_BLACK_PLACEMENTS + rank_bits(_compress(other, mover))
+
+
+def position_pieces(index: int) -> Tuple[int, int]:
+    """
+    Inverse of position_index
+
+    :param index: An int in [0, 3542000)
+    :return: Bitboards of the pieces of the player to move and of the other player
+    """
+    mover_rank, other_rank = divmod(index, NB_BLACK_PLACEMENTS)
+    mover = unrank_bits(mover_rank)
+    return mover, _expand(unrank_bits(other_rank), mover)
+
+
+def full_index(white: int, black: int, player: int) -> int:
+    """
+    Dense index of a NeutreekoGame state
+
+    :param white: Bitboard of the white pieces
+    :param black: Bitboard of the black pieces
+    :param player: The player to move
+    :return: An int in [0, 7084000)
+    """
+    return 2 * position_index(white, black) + (player == const.WHITE)
+
+
+def full_pieces(index: int) -> Tuple[int, int, int]:
+    """
+    Inverse of full_index
+
+    :param index: An int in [0, 7084000)
+    :return: Bitboards of the white and black pieces, and the player to move
+    """
+    index, side = divmod(index, 2)
+    white, black = position_pieces(index)
+    return white, black, const.WHITE if side else const.BLACK
+
+
+def board_easy_index(board: np.array) -> int:
+    """
+    Dense index of a NeutreekoEasyGame board
+
+    :param board: A np array of size (5,5)
+    :return: An int in [0, 2300)
+    """
+    return easy_index(tables.board_to_bits(board, 1))
+
+
+def board_full_index(board: np.array, player: int) -> int:
+    """
+    Dense index of a NeutreekoGame board
+
+    :param board: A np array of size (5,5)
+    :param player: The player to move
+    :return: An int in [0, 7084000)
+    """
+    return full_index(tables.board_to_bits(board, const.WHITE), tables.board_to_bits(board, const.BLACK), player)
+
+
+def easy_board(index: int) -> np.array:
+    """
+    Builds the board of a NeutreekoEasyGame state index
+
+    :param index: An int in [0, 2300)
+    :return: numpy.array
+    """
+    return tables.bits_to_board([0, easy_pieces(index)])
+
+
+def full_board(index: int) -> Tuple[np.array, int]:
+    """
+    Builds the board of a NeutreekoGame state index
+
+    :param index: An int in [0, 7084000)
+    :return: numpy.array and the player to move
+    """
+    white, black, player = full_pieces(index)
+    pieces = [0, 0, 0]
+    pieces[const.WHITE] = white
+    pieces[const.BLACK] = black
+    return tables.bits_to_board(pieces), player
@@ -0,0 +1,37 @@
+from multiprocessing import shared_memory
+from typing import Tuple
+
+import numpy as np
+
+
+class SharedArray:
+    """
+    A NumPy array backed by a named shared memory block, so that it can be attached
+    by name from another process without copying or pickling its content
+    """
+    def __init__(self, shape: tuple, dtype, name: str = None):
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape)) * self.dtype.itemsize, 1)
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.array = np.ndarray(shape, dtype=self.dtype, buffer=self.memory.buf)
+        if self.owner:
+            self.array.fill(0)
+
+    @property
+    def spec(self) -> Tuple[tuple, str, str]:
+        """
+        Everything another process needs to attach the array
+        :return: shape, dtype and name of the block
+        """
+        return self.shape, self.dtype.str, self.memory.name
+
+    def close(self) -> None:
+        """
+        Detaches the array, and frees the block if this process created it
+        """
+        self.array = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
@@ -0,0 +1,125 @@
+"""
+Compact immutable snapshot of a game, to keep many positions alive at once (search trees, replay buffers,
+tournament snapshots) without the dict and (5,5) array of an engine.
+
+A GameState is the 25-bit boards of both players, the player to move and the turns count.
+It is hashable, compares by value, is copied by reference and pickles to a single packed int.
+The engines convert with get_state and set_state. The easy game keeps its pieces in white, with player 1.
+"""
+from typing import List
+
+import numpy as np
+
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import tables
+
+# bit offsets of the fields in GameState.packed
+_BLACK_SHIFT = tables.NB_SQUARES
+_PLAYER_SHIFT = 2 * tables.NB_SQUARES
+_TURNS_SHIFT = _PLAYER_SHIFT + 2
+
+
+class GameState:
+    __slots__ = ('white', 'black', 'player', 'turns')
+
+    def __init__(self, white: int = 0, black: int = 0, player: int = const.BLACK, turns: int = 0):
+        """
+        :param white: Bitboard of the white pieces, the pieces of the easy game
+        :param black: Bitboard of the black pieces, 0 for the easy game
+        :param player: The player to move
+        :param turns: Turns played so far
+        """
+        object.__setattr__(self, 'white', int(white))
+        object.__setattr__(self, 'black', int(black))
+        object.__setattr__(self, 'player', int(player))
+        object.__setattr__(self, 'turns', int(turns))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameState is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("GameState is immutable")
+
+    @classmethod
+    def from_board(cls, board: np.array, player: int = const.BLACK, turns: int = 0) -> 'GameState':
+        """
+        Builds a state from a (5,5) board or a flat board of 25 squares
+
+        :param board: A numpy array, 0 for empty squares and the player values elsewhere
+        :param player: The player to move
+        :param turns: Turns played so far
+        """
+        board = np.asarray(board).reshape((const.BOARD_SIZE, const.BOARD_SIZE))
+        return cls(tables.board_to_bits(board, const.WHITE), tables.board_to_bits(board, const.BLACK), player, turns)
+
+    @classmethod
+    def unpack(cls, packed: int) -> 'GameState':
+        """
+        Inverse of packed
+        """
+        return cls(packed & tables.FULL_BOARD, (packed >> _BLACK_SHIFT) & tables.FULL_BOARD,
+                   (packed >> _PLAYER_SHIFT) & 3, packed >> _TURNS_SHIFT)
+
+    @property
+    def packed(self) -> int:
+        """
+        The whole state in one int: white, black, player and turns from the lowest bits
+
+        :return: A non-negative int, 52 bits and the turns count
+        """
+        return self.white | self.black << _BLACK_SHIFT | self.player << _PLAYER_SHIFT | self.turns << _TURNS_SHIFT
+
+    @property
+    def pieces(self) -> List[int]:
+        """
+        The bitboards indexed by player value, as BitboardGame.pieces
+        """
+        return [0, self.white, self.black]
+
+    @property
+    def board(self) -> np.array:
+        """
+        A new (5,5) int8 board
+        """
+        return tables.bits_to_board(self.pieces)
+
+    @property
+    def flat_board(self) -> np.array:
+        """
+        A new int8 board of 25 squares, indexed by 5*x + y
+        """
+        return self.board.ravel()
+
+    @property
+    def game_over(self) -> bool:
+        """
+        True if a player has 3 in a row
+        """
+        return any(bits & mask == mask for bits in (self.white, self.black) if bits for mask in tables.WIN_MASKS)
+
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return self.packed == other.packed
+
+    def __hash__(self):
+        return hash(self.packed)
+
+    def __reduce__(self):
+        return _unpack, (self.packed,)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return f"GameState(white={self.white:#x}, black={self.black:#x}, player={self.player}, turns={self.turns})"
+
+
+def _unpack(packed: int) -> GameState:
+    """
+    Module-level constructor used by pickle, shorter than a reference to the classmethod
+    """
+    return GameState.unpack(packed)
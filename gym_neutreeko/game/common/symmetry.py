@@ -0,0 +1,257 @@
+"""
+The 8 symmetries of the square (D4), under which the rules of Neutreeko don't change.
+
+A transform t maps the square s to SQUARE_MAPS[t][s] and the direction index d (of tables.DIRECTIONS)
+to DIRECTION_MAPS[t][d]. The canonical representative of a state is the image with the lowest
+ranking index, so the 8 equivalent boards share a single table entry.
+
+The classes of equivalent states are also numbered densely, by increasing canonical index: EASY_CLASSES and
+full_classes map every state index to the id of its class, so a table only needs one row per class.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import ranking
+from gym_neutreeko.game.common import tables
+
+_LAST = const.BOARD_SIZE - 1
+
+# identity, rotations by 90, 180 and 270 degrees, horizontal and vertical flips, transpose and anti-transpose
+TRANSFORMS = (
+    lambda x, y: (x, y),
+    lambda x, y: (y, _LAST - x),
+    lambda x, y: (_LAST - x, _LAST - y),
+    lambda x, y: (_LAST - y, x),
+    lambda x, y: (x, _LAST - y),
+    lambda x, y: (_LAST - x, y),
+    lambda x, y: (y, x),
+    lambda x, y: (_LAST - y, _LAST - x),
+)
+NB_TRANSFORMS = len(TRANSFORMS)
+
+
+def _build_maps() -> Tuple[tuple, tuple, tuple]:
+    """
+    Applies each transform to every square and direction
+
+    :return: The square maps, the direction maps and the index of the inverse of each transform
+    """
+    square_maps = tuple(tuple(tables.square(transform(x, y)) for x, y in tables.SQUARE_COORDS)
+                        for transform in TRANSFORMS)
+    center = const.BOARD_SIZE // 2
+    vectors = list(const.ACTIONS_DICT.values())
+    direction_maps = []
+    for transform in TRANSFORMS:
+        origin = transform(center, center)
+        direction_maps.append(tuple(
+            vectors.index(tuple(np.subtract(transform(center + dx, center + dy), origin).tolist()))
+            for dx, dy in vectors))
+    inverses = tuple(next(u for u in range(NB_TRANSFORMS)
+                          if all(square_maps[u][square_maps[t][s]] == s for s in range(tables.NB_SQUARES)))
+                     for t in range(NB_TRANSFORMS))
+    return square_maps, tuple(direction_maps), inverses
+
+
+SQUARE_MAPS, DIRECTION_MAPS, INVERSES = _build_maps()
+SQUARE_PERMUTATIONS = np.array(SQUARE_MAPS, dtype=np.intp)
+
+_BINOMIALS = np.array(ranking.BINOMIALS, dtype=np.int32)
+
+
+def _rank(squares: np.array) -> np.array:
+    """
+    Vectorized ranking.rank_bits
+
+    :param squares: A (n, 3) array of squares, increasing along each row
+    :return: The n ranks
+    """
+    return _BINOMIALS[0, squares[:, 0]] + _BINOMIALS[1, squares[:, 1]] + _BINOMIALS[2, squares[:, 2]]
+
+
+def _build_easy_classes() -> Tuple[np.array, int]:
+    """
+    Numbers the classes of equivalent NeutreekoEasyGame states
+
+    :return: The class id of every easy index and the number of classes
+    """
+    squares = ranking.UNRANK_TABLE
+    canonical = np.min([_rank(np.sort(permutation[squares], axis=1)) for permutation in SQUARE_PERMUTATIONS], axis=0)
+    canonical_indexes, classes = np.unique(canonical, return_inverse=True)
+    return classes.astype(np.int32), len(canonical_indexes)
+
+
+# class id in [0, NB_EASY_CLASSES) of every ranking.easy_index, EASY_CLASSES[canonical_easy(pieces)[0]] included
+EASY_CLASSES, NB_EASY_CLASSES = _build_easy_classes()
+
+# built by the first call of full_classes
+_full_classes = None
+
+
+def _build_full_classes() -> Tuple[np.array, int]:
+    """
+    Numbers the classes of equivalent NeutreekoGame states, with numpy over the 3542000 positions
+
+    :return: The class id of every full index and the number of classes
+    """
+    mover_rank, other_rank = np.divmod(np.arange(ranking.NB_POSITIONS, dtype=np.int32), ranking.NB_BLACK_PLACEMENTS)
+    white = ranking.UNRANK_TABLE[mover_rank]
+    black = ranking.UNRANK_TABLE[other_rank]
+    # put back the white squares, from the lowest one, see ranking._expand
+    for piece in range(ranking.NB_PIECES):
+        black += black >= white[:, piece:piece + 1]
+
+    canonical = None
+    for permutation in SQUARE_PERMUTATIONS.astype(np.int8):
+        moved_white = np.sort(permutation[white], axis=1)
+        moved_black = np.sort(permutation[black], axis=1)
+        # remove the white squares below each black one, see ranking._compress
+        moved_black -= (moved_black[:, :, None] > moved_white[:, None, :]).sum(axis=2, dtype=np.int8)
+        index = _rank(moved_white) * ranking.NB_BLACK_PLACEMENTS + _rank(moved_black)
+        canonical = index if canonical is None else np.minimum(canonical, index)
+    canonical_indexes, position_classes = np.unique(canonical, return_inverse=True)
+
+    # the player to move is the lowest bit of ranking.full_index, and the transforms don't change it
+    classes = np.empty(ranking.NB_FULL_STATES, dtype=np.int32)
+    classes[0::2] = 2 * position_classes
+    classes[1::2] = 2 * position_classes + 1
+    return classes, 2 * len(canonical_indexes)
+
+
+def full_classes() -> Tuple[np.array, int]:
+    """
+    Dense numbering of the classes of equivalent NeutreekoGame states.
+    The 28 MB array is built by the first call, in a few seconds, and shared by the later ones
+
+    :return: The class id of every ranking.full_index, in [0, number of classes), and the number of classes
+    """
+    global _full_classes
+    if _full_classes is None:
+        _full_classes = _build_full_classes()
+    return _full_classes
+
+
+def transform_bits(bits: int, transform: int) -> int:
+    """
+    Applies a transform to a bitboard
+
+    :param bits: A bitboard
+    :param transform: Index of the transform
+    :return: The transformed bitboard
+    """
+    square_map = SQUARE_MAPS[transform]
+    result = 0
+    while bits:
+        lowest = bits & -bits
+        result |= tables.SQUARE_BIT[square_map[lowest.bit_length() - 1]]
+        bits ^= lowest
+    return result
+
+
+def transform_board(board: np.array, transform: int) -> np.array:
+    """
+    Applies a transform to a (5,5) board
+
+    :param board: A np array of size (5,5)
+    :param transform: Index of the transform
+    :return: A new transformed board
+    """
+    result = np.empty(tables.NB_SQUARES, dtype=board.dtype)
+    result[SQUARE_PERMUTATIONS[transform]] = board.ravel()
+    return result.reshape(board.shape)
+
+
+def canonical_easy(pieces: int) -> Tuple[int, int]:
+    """
+    Canonical index of a NeutreekoEasyGame state
+
+    :param pieces: Bitboard of the 3 pieces
+    :return: The lowest ranking.easy_index of the 8 images and the transform giving it
+    """
+    return min((ranking.easy_index(transform_bits(pieces, t)), t) for t in range(NB_TRANSFORMS))
+
+
+def canonical_full(white: int, black: int, player: int) -> Tuple[int, int]:
+    """
+    Canonical index of a NeutreekoGame state
+
+    :param white: Bitboard of the white pieces
+    :param black: Bitboard of the black pieces
+    :param player: The player to move
+    :return: The lowest ranking.full_index of the 8 images and the transform giving it
+    """
+    return min((ranking.full_index(transform_bits(white, t), transform_bits(black, t), player), t)
+               for t in range(NB_TRANSFORMS))
+
+
+def canonical_board(board: np.array, player: int = None) -> Tuple[np.array, int]:
+    """
+    Canonical representative of a board
+
+    :param board: A np array of size (5,5)
+    :param player: The player to move, None for the easy game
+    :return: The canonical board and the transform that maps board to it
+    """
+    if player is None:
+        _, transform = canonical_easy(tables.board_to_bits(board, 1))
+    else:
+        _, transform = canonical_full(tables.board_to_bits(board, const.WHITE),
+                                      tables.board_to_bits(board, const.BLACK), player)
+    return transform_board(board, transform), transform
+
+
+def transform_move(move: Tuple[tuple, str], transform: int) -> Tuple[tuple, str]:
+    """
+    Applies a transform to a NeutreekoGame move
+
+    :param move: A tuple with the starting position and a direction
+    :param transform: Index of the transform
+    :return: The transformed move
+    """
+    pos, direction = move
+    square = SQUARE_MAPS[transform][tables.square(pos)]
+    return tables.SQUARE_COORDS[square], tables.DIRECTIONS[DIRECTION_MAPS[transform][tables.DIRECTION_INDEX[direction]]]
+
+
+def transform_action(pieces: int, action: int, transform: int, nb_directions: int = 4) -> int:
+    """
+    Applies a transform to an int action, piece * nb_directions + direction, as the one of NeutreekoEasyEnv.
+    The pieces are numbered in increasing square order, so the number of the moved piece can change
+
+    :param pieces: Bitboard of the pieces of the player to move, before the transform
+    :param action: The action
+    :param transform: Index of the transform
+    :param nb_directions: 4 for the easy game, 8 for the full game
+    :return: The action on the transformed board
+    """
+    piece, direction = divmod(action, nb_directions)
+    square = SQUARE_MAPS[transform][tables.bits_to_squares(pieces)[piece]]
+    new_piece = tables.bits_to_squares(transform_bits(pieces, transform)).index(square)
+    return new_piece * nb_directions + DIRECTION_MAPS[transform][direction]
+
+
+def to_canonical_action(pieces: int, action: int, transform: int, nb_directions: int = 4) -> int:
+    """
+    Maps an action of the original board to the canonical board
+
+    :param pieces: Bitboard of the pieces of the player to move, on the original board
+    :param action: The action on the original board
+    :param transform: The transform returned by the canonical_ functions
+    :param nb_directions: 4 for the easy game, 8 for the full game
+    :return: The action on the canonical board
+    """
+    return transform_action(pieces, action, transform, nb_directions)
+
+
+def from_canonical_action(pieces: int, action: int, transform: int, nb_directions: int = 4) -> int:
+    """
+    Maps an action of the canonical board back to the original board
+
+    :param pieces: Bitboard of the pieces of the player to move, on the original board
+    :param action: The action on the canonical board
+    :param transform: The transform returned by the canonical_ functions
+    :param nb_directions: 4 for the easy game, 8 for the full game
+    :return: The action on the original board
+    """
+    return transform_action(transform_bits(pieces, transform), action, INVERSES[transform], nb_directions)
@@ -0,0 +1,233 @@
+"""
+Precomputed lookup tables for the 5x5 Neutreeko board.
+
+Squares are indexed as 5*x + y for a cell in (x, y), the same row-major order np.where walks the board,
+and a set of squares is stored as an integer with bit 5*x + y set for each of its cells.
+"""
+import random
+from typing import Tuple, List
+
+import numpy as np
+
+from gym_neutreeko.game.common import const
+
+NB_SQUARES = const.BOARD_SIZE * const.BOARD_SIZE
+
+# Directions in the order of ACTIONS_DICT, the first 4 are the ones of EASY_ACTIONS_DICT
+DIRECTIONS = list(const.ACTIONS_DICT.keys())
+DIRECTION_INDEX = {name: index for index, name in enumerate(DIRECTIONS)}
+EASY_DIRECTIONS = list(const.EASY_ACTIONS_DICT.keys())
+EASY_DIRECTION_INDEX = {name: index for index, name in enumerate(EASY_DIRECTIONS)}
+
+SQUARE_BIT = tuple(1 << square for square in range(NB_SQUARES))
+SQUARE_COORDS = tuple(divmod(square, const.BOARD_SIZE) for square in range(NB_SQUARES))
+FULL_BOARD = (1 << NB_SQUARES) - 1
+
+
+def square(coords: Tuple[int, int]) -> int:
+    """
+    Returns the square index of a cell
+
+    :param coords: Tuple with 2 ints representing the coordinates of a cell
+    :return: The index 5*x + y
+    """
+    return int(coords[0]) * const.BOARD_SIZE + int(coords[1])
+
+
+def _build_rays() -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+    """
+    For every square and direction, lists the squares crossed when sliding from it until the edge of the board
+
+    :return: A tuple indexed by [square][direction index] of tuples of squares, closest first
+    """
+    rays = []
+    for x, y in SQUARE_COORDS:
+        square_rays = []
+        for dx, dy in const.ACTIONS_DICT.values():
+            ray = []
+            i, j = x + dx, y + dy
+            while (0 <= i < const.BOARD_SIZE) & (0 <= j < const.BOARD_SIZE):
+                ray.append(i * const.BOARD_SIZE + j)
+                i, j = i + dx, j + dy
+            square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+    return tuple(rays)
+
+
+def _build_lines() -> Tuple[Tuple[int, int, int], ...]:
+    """
+    Lists every line of 3 consecutive cells in a row, column or diagonal
+
+    :return: A tuple with the 48 lines as tuples of 3 square indexes
+    """
+    lines = []
+    for x, y in SQUARE_COORDS:
+        for dx, dy in (const.RIGHT, const.DOWN, const.DOWN_RIGHT, const.DOWN_LEFT):
+            end_x, end_y = x + 2 * dx, y + 2 * dy
+            if (0 <= end_x < const.BOARD_SIZE) & (0 <= end_y < const.BOARD_SIZE):
+                lines.append(tuple((x + k * dx) * const.BOARD_SIZE + y + k * dy for k in range(3)))
+    return tuple(lines)
+
+
+RAYS = _build_rays()
+
+# Winning lines, as a (48, 3) array of squares and as bit masks
+LINES = _build_lines()
+LINE_SQUARES = np.array(LINES, dtype=np.intp)
+WIN_MASKS = tuple(sum(SQUARE_BIT[index] for index in line) for line in LINES)
+
+# For each square, only the lines going through it, so that a move can be checked by its destination
+LINES_THROUGH = tuple(tuple(mask for mask in WIN_MASKS if mask & SQUARE_BIT[index]) for index in range(NB_SQUARES))
+LINE_SQUARES_THROUGH = tuple(LINE_SQUARES[[index in line for line in LINES]] for index in range(NB_SQUARES))
+
+
+def _build_padded_tables() -> Tuple[np.array, np.array]:
+    """
+    Stores RAYS and LINE_SQUARES_THROUGH as arrays, for vectorized lookups over flat boards with an extra
+    sentinel cell at index NB_SQUARES. The rows are padded with NB_SQUARES, so every ray ends on the sentinel
+
+    :return: The (25, 8, 5) rays array and the (25, 12, 3) lines-through array
+    """
+    ray_table = np.full((NB_SQUARES, len(DIRECTIONS), const.BOARD_SIZE), NB_SQUARES, dtype=np.intp)
+    lines_table = np.full((NB_SQUARES, max(map(len, LINES_THROUGH)), 3), NB_SQUARES, dtype=np.intp)
+    for index in range(NB_SQUARES):
+        for direction, ray in enumerate(RAYS[index]):
+            ray_table[index, direction, :len(ray)] = ray
+        lines_table[index, :len(LINE_SQUARES_THROUGH[index])] = LINE_SQUARES_THROUGH[index]
+    return ray_table, lines_table
+
+
+RAY_TABLE, LINES_THROUGH_TABLE = _build_padded_tables()
+
+
+def _build_slides() -> Tuple[tuple, tuple]:
+    """
+    For every square and direction, maps each set of occupied squares of the ray to the square reached by
+    sliding along it, the one just before the first occupied square
+
+    :return: The ray masks indexed by [square][direction index], and the dicts indexed the same way
+        from (occupied & ray mask) to the destination square, -1 if the first square of the ray is occupied
+    """
+    masks = tuple(tuple(sum(SQUARE_BIT[target] for target in ray) for ray in rays) for rays in RAYS)
+    slides = []
+    for rays in RAYS:
+        square_slides = []
+        for ray in rays:
+            table = {}
+            for subset in range(1 << len(ray)):
+                blockers = sum(SQUARE_BIT[target] for bit, target in enumerate(ray) if subset >> bit & 1)
+                first = next((bit for bit in range(len(ray)) if subset >> bit & 1), len(ray))
+                table[blockers] = ray[first - 1] if first else -1
+            square_slides.append(table)
+        slides.append(tuple(square_slides))
+    return masks, tuple(slides)
+
+
+# The slide of a piece is a single lookup: SLIDES[square][direction][occupied & RAY_MASKS[square][direction]]
+RAY_MASKS, SLIDES = _build_slides()
+
+
+def slide(index: int, direction: int, occupied: int) -> int:
+    """
+    Returns the square reached by a piece sliding from a square until the next piece or the edge of the board
+
+    :param index: The starting square index
+    :param direction: The direction index, as in DIRECTIONS
+    :param occupied: Bitboard of every piece on the board
+    :return: The destination square index, -1 if the piece can't move
+    """
+    return SLIDES[index][direction][occupied & RAY_MASKS[index][direction]]
+
+
+def _build_zobrist() -> Tuple[Tuple[Tuple[int, ...], ...], int]:
+    """
+    Random 63-bit keys for Zobrist hashing, from a fixed seed so that hashes are the same in every process
+
+    :return: The keys indexed by [player value][square] (the row 0 is unused) and the key of the side to move
+    """
+    # random.Random rather than numpy.random, which costs more to import than the whole package
+    generator = random.Random(0x4E55)
+    keys = [generator.getrandbits(63) for _ in range(3 * NB_SQUARES + 1)]
+    return tuple(tuple(keys[player * NB_SQUARES:(player + 1) * NB_SQUARES]) for player in range(3)), keys[-1]
+
+
+# The hash of a position is the xor of ZOBRIST[player][square] for every piece, xor ZOBRIST_SIDE if white is to move
+ZOBRIST, ZOBRIST_SIDE = _build_zobrist()
+
+
+def bits_to_squares(bits: int) -> List[int]:
+    """
+    Lists the squares set in a bitboard
+
+    :param bits: A bitboard
+    :return: The square indexes, in increasing order
+    """
+    squares = []
+    while bits:
+        lowest = bits & -bits
+        squares.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return squares
+
+
+def squares_to_bits(squares) -> int:
+    """
+    Builds a bitboard from square indexes
+
+    :param squares: Iterable of square indexes
+    :return: The bitboard
+    """
+    bits = 0
+    for index in squares:
+        bits |= SQUARE_BIT[index]
+    return bits
+
+
+def board_to_bits(board: np.array, player: int) -> int:
+    """
+    Builds the bitboard of a player's pieces from a (5,5) board
+
+    :param board: A np array of size (5,5)
+    :param player: Integer representing the player
+    :return: The bitboard
+    """
+    return squares_to_bits(np.flatnonzero(board == player).tolist())
+
+
+def occupied_bits(board: np.array) -> int:
+    """
+    Builds the bitboard of every piece of a (5,5) board
+
+    :param board: A np array of size (5,5)
+    :return: The bitboard
+    """
+    return squares_to_bits(np.flatnonzero(board).tolist())
+
+
+def bits_to_board(pieces: List[int]) -> np.array:
+    """
+    Builds a (5,5) board from the bitboards of each player
+
+    :param pieces: A list indexed by player value with the bitboard of that player's pieces
+    :return: The board, each element is a numpy.int8
+    """
+    board = np.zeros(NB_SQUARES, dtype=np.int8)
+    for player, bits in enumerate(pieces):
+        if player and bits:
+            board[bits_to_squares(bits)] = player
+    return board.reshape((const.BOARD_SIZE, const.BOARD_SIZE))
+
+
+def zobrist_hash(board: np.array, player: int = None) -> int:
+    """
+    Zobrist hash of a (5,5) board, see ZOBRIST
+
+    :param board: A np array of size (5,5)
+    :param player: The player to move, None for the easy game
+    :return: A 63-bit int
+    """
+    key = ZOBRIST_SIDE if player == const.WHITE else 0
+    cells = board.ravel()
+    for index in np.flatnonzero(cells).tolist():
+        key ^= ZOBRIST[cells[index]][index]
+    return key
@@ -0,0 +1,504 @@
+import numpy as np
+from typing import Tuple, List, Union
+
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import ranking
+from gym_neutreeko.game.common import tables
+from gym_neutreeko.game.common.state import GameState
+from gym_neutreeko.game.engine import movegen
+
+
+class BitboardEasyGame:
+    """
+    Bitboard version of NeutreekoEasyGame, with the same public API.
+    The pieces are kept in a 25-bit integer and moves slide along the precomputed rays of tables.RAYS
+    """
+    def __init__(self):
+        self.pieces = None
+        self.current_player = None
+        self.game_over = None
+        self.turns_count = None
+        self.move_stack = None
+        self._hash = None
+        self._board = None
+        self.move_buffer = movegen.new_move_buffer()
+        # draws the starting boards, replaced by the seed of the environment
+        self.rng = np.random.default_rng()
+
+    def reset(self) -> None:
+        """
+        Resets the game, with a new board, turns count to 0 and designates the first player
+        :return:
+        """
+        self.pieces = self.new_pieces(self.rng)
+        self._board = None
+        self.current_player = 1
+        self.game_over = False
+        self.turns_count = 0
+        self.move_stack = []
+        self._hash = tables.zobrist_hash(self.board)
+
+    @staticmethod
+    def new_pieces(rng: 'np.random.Generator' = None) -> int:
+        """
+        Returns the bitboard of a random starting board, from one uniform draw of a state index
+
+        :param rng: The random generator, a new unseeded one if None
+        :return: A 25-bit integer with 3 bits set
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        return ranking.easy_pieces(int(rng.integers(ranking.NB_EASY_STATES)))
+
+    @property
+    def board(self) -> np.array:
+        """
+        Read-only (5,5) view of the bitboard, rebuilt only after the pieces change
+
+        :return: numpy.array
+        """
+        if self._board is None:
+            self._board = tables.bits_to_board([0, self.pieces])
+            self._board.setflags(write=False)
+        return self._board
+
+    @board.setter
+    def board(self, board: np.array) -> None:
+        self.pieces = tables.board_to_bits(board, 1)
+        self._board = None
+        self._hash = tables.zobrist_hash(board)
+
+    @property
+    def state_index(self) -> int:
+        """
+        Dense index of the current board, see ranking.easy_index
+
+        :return: An int in [0, 2300)
+        """
+        return ranking.easy_index(self.pieces)
+
+    @property
+    def hash(self) -> int:
+        """
+        Zobrist hash of the board, updated incrementally by each move
+
+        :return: A 63-bit int, see tables.ZOBRIST
+        """
+        return self._hash
+
+    def player_bits(self, player: int = 1) -> int:
+        """
+        Bitboard of a player's pieces, without building the board
+
+        :param player: Integer representing the player
+        :return: The bitboard, 0 for a player without pieces
+        """
+        return self.pieces if player == 1 else 0
+
+    def get_state(self) -> GameState:
+        """
+        Compact immutable snapshot of the game, see state.GameState
+        """
+        return GameState(self.pieces, 0, 1, self.turns_count)
+
+    def set_state(self, state: GameState) -> None:
+        """
+        Restores a snapshot of get_state, without any move to pop
+        """
+        self.pieces = state.white
+        self._board = None
+        self.current_player = 1
+        self.turns_count = state.turns
+        self.game_over = state.game_over
+        self.move_stack = []
+        self._hash = tables.zobrist_hash(self.board)
+
+    def slide(self, square: int, direction: int) -> Union[None, int]:
+        """
+        Returns the square reached by sliding from square in a direction, None if the piece can't move
+
+        :param square: The starting square index
+        :param direction: The direction index, as in tables.DIRECTIONS
+        :return: The resulting square index or None
+        """
+        destination = tables.slide(square, direction, self.pieces)
+        return None if destination < 0 else destination
+
+    def check_direction(self, coords: Tuple[int, int], direction: str) -> Union[None, Tuple[int, int]]:
+        """
+        Returns the resulting position given a starting position and a direction.
+        If the direction is not valid (can't make progress in that direction), returns None
+
+        :param coords: Coordinates of intial point
+        :param direction: String representation of the direction to take
+        :return: None if direction is not valid OR tuple with new coords of resulting positions
+        """
+        destination = self.slide(tables.square(coords), tables.DIRECTION_INDEX[direction])
+        return None if destination is None else tables.SQUARE_COORDS[destination]
+
+    def available_directions(self, coords: Tuple[int, int]) -> List[str]:
+        """
+        Finds which directions are available for a piece on the coords tuple
+
+        :param coords: The coordinates of a piece
+        :return: A list of directions
+        """
+        square = tables.square(coords)
+        return [name for index, name in enumerate(tables.EASY_DIRECTIONS) if self.slide(square, index) is not None]
+
+    def get_possible_moves(self, player: int, only_valid: bool = False) -> List[int]:
+        """
+        Return all the possible moves for a given player with the current board
+
+        :param player: Integer representing the player
+        :param only_valid: returns only the valid moves
+        :return: A list of ints representing possible actions
+        """
+        if player != 1:
+            return []
+        if only_valid:
+            return self.legal_moves(player)[:, movegen.ACTION].tolist()
+        return list(range(len(tables.EASY_DIRECTIONS) * len(tables.bits_to_squares(self.pieces))))
+
+    def legal_moves(self, player: int = 1) -> np.array:
+        """
+        Valid moves of a player, written in the preallocated move_buffer
+
+        :param player: Integer representing the player
+        :return: A view of move_buffer with one (action, from square, to square) row per move, see movegen,
+            overwritten by the next call
+        """
+        return movegen.generate_moves(self.player_bits(player), self.pieces, len(tables.EASY_DIRECTIONS), self.move_buffer)
+
+    def action_handler(self, pos, dir) -> Union[None, Tuple[tuple, str]]:
+        """
+        Effectuates the movement of the piece in pos, in the direction dir
+
+        :param pos: The position of the piece that will be moved
+        :param dir: The direction that the piece will be moved to
+        :return: A tuple with the resulting position and the move type. None if the move is not valid
+        """
+        square = tables.square(pos)
+        if not self.pieces & tables.SQUARE_BIT[square]:
+            return None
+        destination = self.slide(square, tables.DIRECTION_INDEX[dir])
+        if destination is None:
+            return None
+
+        self.pieces ^= tables.SQUARE_BIT[square] | tables.SQUARE_BIT[destination]
+        self._board = None
+        self.turns_count += 1
+        self._hash ^= tables.ZOBRIST[1][square] ^ tables.ZOBRIST[1][destination]
+
+        self.game_over = any(self.pieces & mask == mask for mask in tables.LINES_THROUGH[destination])
+
+        move_type = "win" if self.game_over else "default"
+        return tables.SQUARE_COORDS[destination], move_type
+
+    def push(self, move: int) -> Union[None, str]:
+        """
+        Makes a move that can be undone with pop
+
+        :param move: An int representing an action, as returned by get_possible_moves
+        :return: The move type, None if the move is not valid
+        """
+        square = tables.bits_to_squares(self.pieces)[move // 4]
+        game_over = self.game_over
+        move_check = self.action_handler(tables.SQUARE_COORDS[square], tables.EASY_DIRECTIONS[move % 4])
+        if not move_check:
+            return None
+        # undo record: from, to and the previous game_over
+        self.move_stack.append((square, tables.square(move_check[0]), game_over))
+        return move_check[1]
+
+    def pop(self) -> None:
+        """
+        Undoes the last move made with push
+        """
+        square, destination, game_over = self.move_stack.pop()
+        self.pieces ^= tables.SQUARE_BIT[square] | tables.SQUARE_BIT[destination]
+        self._board = None
+        self.turns_count -= 1
+        self._hash ^= tables.ZOBRIST[1][square] ^ tables.ZOBRIST[1][destination]
+        self.game_over = game_over
+
+    def render(self) -> None:
+        """
+        Renders the game on the screen
+        """
+        print(self.board)
+
+
+class BitboardGame:
+    """
+    Bitboard version of NeutreekoGame, with the same public API.
+    pieces is indexed by player value and holds the 25-bit integer of that player's pieces
+    """
+    def __init__(self):
+        self.pieces = None
+        self.current_player = None
+        self.game_over = None
+        self.turns_count = None
+        self.move_stack = None
+        self._hash = None
+        self._board = None
+        # occurrences of each position by hash, see update_repetitions
+        self.repetitions = None
+        self.draw = None
+        self.move_buffer = movegen.new_move_buffer()
+
+    def reset(self):
+        self.pieces = self.new_pieces()
+        self._board = None
+        self.current_player = const.BLACK
+        self.game_over = False
+        self.turns_count = 0
+        self.move_stack = []
+        self._hash = tables.zobrist_hash(self.board, self.current_player)
+        self.repetitions = {self._hash: 1}
+        self.draw = False
+
+    @staticmethod
+    def new_pieces() -> List[int]:
+        """
+        Returns the bitboards of the fresh starting board of NeutreekoGame.new_board
+
+        :return: A list indexed by player value
+        """
+        pieces = [0, 0, 0]
+        pieces[const.WHITE] = tables.squares_to_bits([1, 3, 17])
+        pieces[const.BLACK] = tables.squares_to_bits([7, 21, 23])
+        return pieces
+
+    @property
+    def board(self) -> np.array:
+        """
+        Read-only (5,5) view of the bitboards, rebuilt only after the pieces change
+
+        :return: numpy.array
+        """
+        if self._board is None:
+            self._board = tables.bits_to_board(self.pieces)
+            self._board.setflags(write=False)
+        return self._board
+
+    @board.setter
+    def board(self, board: np.array) -> None:
+        self.pieces = [0, 0, 0]
+        self.pieces[const.WHITE] = tables.board_to_bits(board, const.WHITE)
+        self.pieces[const.BLACK] = tables.board_to_bits(board, const.BLACK)
+        self._board = None
+        self._hash = tables.zobrist_hash(board, self.current_player)
+        # a position set from outside starts a new history
+        self.repetitions = {self._hash: 1}
+        self.draw = False
+
+    @property
+    def state_index(self) -> int:
+        """
+        Dense index of the current board and player to move, see ranking.full_index
+
+        :return: An int in [0, 7084000)
+        """
+        return ranking.full_index(self.pieces[const.WHITE], self.pieces[const.BLACK], self.current_player)
+
+    @property
+    def hash(self) -> int:
+        """
+        Zobrist hash of the board and player to move, updated incrementally by each move
+
+        :return: A 63-bit int, see tables.ZOBRIST
+        """
+        return self._hash
+
+    def player_bits(self, player: int) -> int:
+        """
+        Bitboard of a player's pieces, without building the board
+
+        :param player: Integer representing the player
+        :return: The bitboard, see pieces
+        """
+        return self.pieces[player]
+
+    def get_state(self) -> GameState:
+        """
+        Compact immutable snapshot of the game, see state.GameState.
+        The repetition history isn't part of it
+        """
+        return GameState(self.pieces[const.WHITE], self.pieces[const.BLACK], self.current_player, self.turns_count)
+
+    def set_state(self, state: GameState) -> None:
+        """
+        Restores a snapshot of get_state, without any move to pop and with a new repetition history
+        """
+        self.pieces = state.pieces
+        self._board = None
+        self.current_player = state.player
+        self.turns_count = state.turns
+        self.game_over = state.game_over
+        self.move_stack = []
+        self._hash = tables.zobrist_hash(self.board, self.current_player)
+        self.repetitions = {self._hash: 1}
+        self.draw = False
+
+    def owner(self, square: int) -> int:
+        """
+        Returns the value of the player with a piece in square
+
+        :param square: A square index
+        :return: const.WHITE, const.BLACK or 0 if the square is free
+        """
+        bit = tables.SQUARE_BIT[square]
+        if self.pieces[const.WHITE] & bit:
+            return const.WHITE
+        if self.pieces[const.BLACK] & bit:
+            return const.BLACK
+        return 0
+
+    def slide(self, square: int, direction: int) -> Union[None, int]:
+        """
+        Returns the square reached by sliding from square in a direction, None if the piece can't move
+
+        :param square: The starting square index
+        :param direction: The direction index, as in tables.DIRECTIONS
+        :return: The resulting square index or None
+        """
+        destination = tables.slide(square, direction, self.pieces[const.WHITE] | self.pieces[const.BLACK])
+        return None if destination < 0 else destination
+
+    def check_direction(self, coords: Tuple[int, int], direction: str) -> Union[None, Tuple[int, int]]:
+        """
+        Returns the resulting position given a starting position and a direction.
+        If the direction is not valid, returns None
+
+        :param coords: Coordinates of intial point
+        :param direction: String representation of the direction to take
+        :return: None if direction is not valid OR tuple with new coords of resulting positions
+        """
+        destination = self.slide(tables.square(coords), tables.DIRECTION_INDEX[direction])
+        return None if destination is None else tables.SQUARE_COORDS[destination]
+
+    def available_directions(self, coords: Tuple[int, int]) -> List[str]:
+        """
+        For some starting coords, returns the list of directions a piece can move to
+        """
+        square = tables.square(coords)
+        return [name for index, name in enumerate(tables.DIRECTIONS) if self.slide(square, index) is not None]
+
+    def get_possible_moves(self, player: int, only_valid: bool = False) -> List[tuple]:
+        """
+        Return all the possible moves for a given player with the current board
+
+        :param player: Integer representing the player
+        :param only_valid:
+        :return: A list of tuples with the starting position and a direction
+        """
+        if only_valid:
+            return [(tables.SQUARE_COORDS[square], tables.DIRECTIONS[action % len(tables.DIRECTIONS)])
+                    for action, square, _ in self.legal_moves(player).tolist()]
+        return [(tables.SQUARE_COORDS[square], direction)
+                for square in tables.bits_to_squares(self.pieces[player]) for direction in tables.DIRECTIONS]
+
+    def legal_moves(self, player: int = None) -> np.array:
+        """
+        Valid moves of a player, written in the preallocated move_buffer
+
+        :param player: Integer representing the player, the player to move if None
+        :return: A view of move_buffer with one (action, from square, to square) row per move, see movegen,
+            overwritten by the next call
+        """
+        player = self.current_player if player is None else player
+        return movegen.generate_moves(self.pieces[player], self.pieces[const.WHITE] | self.pieces[const.BLACK],
+                                      len(tables.DIRECTIONS), self.move_buffer)
+
+    def action_handler(self, pos, dir):
+        """
+        After the agent chooses a move, it needs to be checked to see if it's valid
+        If it is valid, returns new position
+
+        :param pos: The position of the piece that will be moved
+        :param dir: The direction that the piece will be moved to
+        :return:
+        """
+        square = tables.square(pos)
+        player = self.owner(square)
+        if not player:
+            return None
+        destination = self.slide(square, tables.DIRECTION_INDEX[dir])
+        if destination is None:
+            return None
+
+        self.pieces[player] ^= tables.SQUARE_BIT[square] | tables.SQUARE_BIT[destination]
+        self._board = None
+        self._hash ^= tables.ZOBRIST[player][square] ^ tables.ZOBRIST[player][destination]
+        self.update_player_turns()
+
+        # only the lines through the moved piece can have been completed, and only by its owner
+        pieces = self.pieces[player]
+        self.game_over = any(pieces & mask == mask for mask in tables.LINES_THROUGH[destination])
+        move_type = "win" if self.game_over else "default"
+        if self.update_repetitions():
+            move_type = "draw"
+        return dir, tables.SQUARE_COORDS[destination], move_type
+
+    def push(self, move: Tuple[tuple, str]) -> Union[None, str]:
+        """
+        Makes a move that can be undone with pop
+
+        :param move: A tuple with the starting position and a direction, as returned by get_possible_moves
+        :return: The move type, None if the move is not valid
+        """
+        pos, dir = move
+        game_over, draw = self.game_over, self.draw
+        move_check = self.action_handler(pos, dir)
+        if not move_check:
+            return None
+        # undo record: from, to and the previous game_over and draw
+        self.move_stack.append((tables.square(pos), tables.square(move_check[1]), game_over, draw))
+        return move_check[2]
+
+    def pop(self) -> None:
+        """
+        Undoes the last move made with push
+        """
+        square, destination, game_over, draw = self.move_stack.pop()
+        self.forget_repetition()
+        self.current_player = const.WHITE if self.current_player == const.BLACK else const.BLACK
+        self.pieces[self.current_player] ^= tables.SQUARE_BIT[square] | tables.SQUARE_BIT[destination]
+        self._board = None
+        self._hash ^= tables.ZOBRIST[self.current_player][square] ^ tables.ZOBRIST[self.current_player][destination] \
+            ^ tables.ZOBRIST_SIDE
+        self.turns_count -= 1
+        self.game_over = game_over
+        self.draw = draw
+
+    def update_repetitions(self) -> bool:
+        """
+        Counts one more occurrence of the current position, and draws the game on the third one.
+        A win on the same move takes precedence
+
+        :return: True if the move drew the game
+        """
+        count = self.repetitions.get(self._hash, 0) + 1
+        self.repetitions[self._hash] = count
+        if count >= const.REPETITIONS and not self.game_over:
+            self.game_over = self.draw = True
+            return True
+        return False
+
+    def forget_repetition(self) -> None:
+        """
+        Removes the occurrence of the current position counted by update_repetitions, before the move is undone
+        """
+        count = self.repetitions[self._hash] - 1
+        if count:
+            self.repetitions[self._hash] = count
+        else:
+            del self.repetitions[self._hash]
+
+    def update_player_turns(self):
+        self.current_player = const.WHITE if self.current_player == const.BLACK else const.BLACK
+        self.turns_count += 1
+        self._hash ^= tables.ZOBRIST_SIDE
+
+    def render(self):
+        print(self.board)
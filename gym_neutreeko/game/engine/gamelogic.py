@@ -3,7 +3,11 @@ import numpy as np
 from typing import Tuple, List, Union
 
 from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import ranking
+from gym_neutreeko.game.common import tables
+from gym_neutreeko.game.common.state import GameState
 from gym_neutreeko.game.common.gameutils import NeutreekoUtils as utils
+from gym_neutreeko.game.engine import movegen
 
 
 class NeutreekoEasyGame:
@@ -12,49 +16,79 @@ class NeutreekoEasyGame:
         self.current_player = None
         self.game_over = None
         self.turns_count = None
+        self.move_stack = None
+        self._hash = None
+        self.move_buffer = movegen.new_move_buffer()
+        # draws the starting boards, replaced by the seed of the environment
+        self.rng = np.random.default_rng()
 
     def reset(self) -> None:
         """
         Resets the game, with a new board, turns count to 0 and designates the first player
         :return:
         """
-        self.board = self.new_board()
+        self.board = self.new_board(self.rng)
         self.current_player = 1
         self.game_over = False
         self.turns_count = 0
+        self.move_stack = []
+        self._hash = tables.zobrist_hash(self.board)
 
     @staticmethod
-    def new_board() -> np.array:
+    def new_board(rng: 'np.random.Generator' = None) -> np.array:
         """
-        Returns a random starting board, each element is a numpy.int8 (-128, 127)
+        Returns a random starting board, each element is a numpy.int8 (-128, 127).
+        The 3 distinct squares are one uniform draw of a state index, so there is no rejection loop
 
+        :param rng: The random generator, a new unseeded one if None
         :return: numpy.array
         """
-        board = np.array([[0, 0, 0, 0, 0],
-                          [0, 0, 0, 0, 0],
-                          [0, 0, 0, 0, 0],
-                          [0, 0, 0, 0, 0],
-                          [0, 0, 0, 0, 0]], dtype=np.int8)
-        piece_1_x = np.random.randint(0, 5)
-        piece_1_y = np.random.randint(0, 5)
+        rng = np.random.default_rng() if rng is None else rng
+        return ranking.easy_board(int(rng.integers(ranking.NB_EASY_STATES)))
+
+    @property
+    def state_index(self) -> int:
+        """
+        Dense index of the current board, see ranking.easy_index
+
+        :return: An int in [0, 2300)
+        """
+        return ranking.board_easy_index(self.board)
 
-        piece_2_x = np.random.randint(0, 5)
-        piece_2_y = np.random.randint(0, 5)
-        while (piece_1_x == piece_2_x) & (piece_1_y == piece_2_y):
-            piece_2_x = np.random.randint(0, 5)
-            piece_2_y = np.random.randint(0, 5)
+    @property
+    def hash(self) -> int:
+        """
+        Zobrist hash of the board, updated incrementally by update_game
 
-        piece_3_x = np.random.randint(0, 5)
-        piece_3_y = np.random.randint(0, 5)
-        while ((piece_1_x == piece_3_x) & (piece_1_y == piece_3_y)) | ((piece_2_x == piece_3_x) & (piece_2_y == piece_3_y)):
-            piece_3_x = np.random.randint(0, 5)
-            piece_3_y = np.random.randint(0, 5)
+        :return: A 63-bit int, see tables.ZOBRIST
+        """
+        return self._hash
 
-        board[piece_1_x][piece_1_y] = 1
-        board[piece_2_x][piece_2_y] = 1
-        board[piece_3_x][piece_3_y] = 1
+    def player_bits(self, player: int) -> int:
+        """
+        Bitboard of a player's pieces, built from the board
 
-        return board
+        :param player: Integer representing the player
+        :return: The bitboard, see tables.board_to_bits
+        """
+        return tables.board_to_bits(self.board, player)
+
+    def get_state(self) -> GameState:
+        """
+        Compact immutable snapshot of the game, see state.GameState
+        """
+        return GameState(tables.board_to_bits(self.board, 1), 0, 1, self.turns_count)
+
+    def set_state(self, state: GameState) -> None:
+        """
+        Restores a snapshot of get_state, without any move to pop
+        """
+        self.board = state.board
+        self.current_player = 1
+        self.turns_count = state.turns
+        self.game_over = state.game_over
+        self.move_stack = []
+        self._hash = tables.zobrist_hash(self.board)
 
     def value_in_board(self, position: Tuple[int, int]) -> int:
         """
@@ -96,17 +130,10 @@ class NeutreekoEasyGame:
         :param direction: String representation of the direction to take
         :return: None if direction is not valid OR tuple with new coords of resulting positions
         """
-        action_coords = const.EASY_ACTIONS_DICT[direction]
-        attempt_coords = tuple(np.add(coords, action_coords))
-        free_cell = self.free_cell(attempt_coords)
-        if not free_cell:
-            return None
-        # apply direction until it reaches EOB (end of board) or another piece
-        while free_cell:
-            new_coords = attempt_coords
-            attempt_coords = tuple(np.add(new_coords, action_coords))
-            free_cell = self.free_cell(attempt_coords)
-        return new_coords
+        # the piece slides until it reaches EOB (end of board) or another piece, see tables.SLIDES
+        destination = tables.slide(tables.square(coords), tables.EASY_DIRECTION_INDEX[direction],
+                                   tables.occupied_bits(self.board))
+        return None if destination < 0 else tables.SQUARE_COORDS[destination]
 
     def available_directions(self, coords: Tuple[int, int]) -> List[str]:
         """
@@ -130,6 +157,9 @@ class NeutreekoEasyGame:
         :param only_valid: returns only the valid moves
         :return: A list of ints representing possible actions
         """
+        if only_valid:
+            return self.legal_moves(player)[:, movegen.ACTION].tolist()
+
         dirs_value = {
             'UP': 0,
             'DOWN': 1,
@@ -145,19 +175,23 @@ class NeutreekoEasyGame:
         # for each player piece
         piece_value = 0
         for pos in list_of_coordinates:
-            if only_valid:
-                # checks which directions are available
-                dirs = self.available_directions(pos)
-                for dir in dirs:
-                    value = 4*piece_value + dirs_value[dir]
-                    possible_moves.append(value)
-            else:
-                # adds every direction
-                for dir in const.EASY_ACTIONS_DICT.keys():
-                    possible_moves.append(4*piece_value + dirs_value[dir])
+            # adds every direction
+            for dir in const.EASY_ACTIONS_DICT.keys():
+                possible_moves.append(4*piece_value + dirs_value[dir])
             piece_value += 1
         return possible_moves
 
+    def legal_moves(self, player: int = 1) -> np.array:
+        """
+        Valid moves of a player, written in the preallocated move_buffer
+
+        :param player: Integer representing the player
+        :return: A view of move_buffer with one (action, from square, to square) row per move, see movegen,
+            overwritten by the next call
+        """
+        return movegen.generate_moves(self.player_bits(player), tables.occupied_bits(self.board),
+                                      len(tables.EASY_DIRECTIONS), self.move_buffer)
+
     def action_handler(self, pos, dir) -> Union[None, Tuple[tuple, str]]:
         """
         Effectuates the movement of the piece in pos, in the direction dir
@@ -166,6 +200,9 @@ class NeutreekoEasyGame:
         :param dir: The direction that the piece will be moved to
         :return: A tuple with the resulting position and the move type. None if the move is not valid
         """
+        # an empty origin isn't a move, as in BitboardEasyGame
+        if not self.value_in_board(pos):
+            return None
         result = self.check_direction(pos, dir)
         if not result:
             return None
@@ -173,11 +210,38 @@ class NeutreekoEasyGame:
         self.update_game(pos, result)
         self.turns_count += 1
 
-        self.game_over = utils.find_sequence_board(self.board, np.array([1, 1, 1]))
+        # only the lines through the moved piece can have been completed
+        self.game_over = utils.find_sequence_cell(self.board, result, 1)
 
         move_type = "win" if self.game_over else "default"
         return result, move_type
 
+    def push(self, move: int) -> Union[None, str]:
+        """
+        Makes a move that can be undone with pop, without copying the board
+
+        :param move: An int representing an action, as returned by get_possible_moves
+        :return: The move type, None if the move is not valid
+        """
+        result = np.where(self.board == 1)
+        pos = (result[0][move // 4], result[1][move // 4])
+        game_over = self.game_over
+        move_check = self.action_handler(pos, tables.EASY_DIRECTIONS[move % 4])
+        if not move_check:
+            return None
+        # undo record: from, to and the previous game_over
+        self.move_stack.append((pos, move_check[0], game_over))
+        return move_check[1]
+
+    def pop(self) -> None:
+        """
+        Undoes the last move made with push
+        """
+        pos, result, game_over = self.move_stack.pop()
+        self.update_game(result, pos)
+        self.turns_count -= 1
+        self.game_over = game_over
+
     def update_game(self, pos, result) -> None:
         """
         Replaces the piece in the board
@@ -186,7 +250,7 @@ class NeutreekoEasyGame:
         """
         self.replace_in_board(result, 1)
         self.replace_in_board(pos, 0)
-        pass
+        self._hash ^= tables.ZOBRIST[1][tables.square(pos)] ^ tables.ZOBRIST[1][tables.square(result)]
 
     def render(self) -> None:
         """
@@ -201,12 +265,22 @@ class NeutreekoGame:
         self.current_player = None
         self.game_over = None
         self.turns_count = None
+        self.move_stack = None
+        self._hash = None
+        # occurrences of each position by hash, see update_repetitions
+        self.repetitions = None
+        self.draw = None
+        self.move_buffer = movegen.new_move_buffer()
 
     def reset(self):
         self.board = self.new_board()
         self.current_player = const.BLACK
         self.game_over = False
         self.turns_count = 0
+        self.move_stack = []
+        self._hash = tables.zobrist_hash(self.board, self.current_player)
+        self.repetitions = {self._hash: 1}
+        self.draw = False
 
     @staticmethod
     def new_board():
@@ -221,6 +295,53 @@ class NeutreekoGame:
                          [0, 0, 1, 0, 0],
                          [0, 2, 0, 2, 0]], dtype=np.int8)
 
+    @property
+    def state_index(self) -> int:
+        """
+        Dense index of the current board and player to move, see ranking.full_index
+
+        :return: An int in [0, 7084000)
+        """
+        return ranking.board_full_index(self.board, self.current_player)
+
+    @property
+    def hash(self) -> int:
+        """
+        Zobrist hash of the board and player to move, updated incrementally by update_game and update_player_turns
+
+        :return: A 63-bit int, see tables.ZOBRIST
+        """
+        return self._hash
+
+    def player_bits(self, player: int) -> int:
+        """
+        Bitboard of a player's pieces, built from the board
+
+        :param player: Integer representing the player
+        :return: The bitboard, see tables.board_to_bits
+        """
+        return tables.board_to_bits(self.board, player)
+
+    def get_state(self) -> GameState:
+        """
+        Compact immutable snapshot of the game, see state.GameState.
+        The repetition history isn't part of it
+        """
+        return GameState.from_board(self.board, self.current_player, self.turns_count)
+
+    def set_state(self, state: GameState) -> None:
+        """
+        Restores a snapshot of get_state, without any move to pop and with a new repetition history
+        """
+        self.board = state.board
+        self.current_player = state.player
+        self.turns_count = state.turns
+        self.game_over = state.game_over
+        self.move_stack = []
+        self._hash = tables.zobrist_hash(self.board, self.current_player)
+        self.repetitions = {self._hash: 1}
+        self.draw = False
+
     def value_in_board(self, position: Tuple[int, int]) -> int:
         """
         Returns the value in a position of the board
@@ -260,17 +381,10 @@ class NeutreekoGame:
         :param direction: String representation of the direction to take
         :return: None if direction is not valid OR tuple with new coords of resulting positions
         """
-        action_coords = const.ACTIONS_DICT[direction]
-        attempt_coords = tuple(np.add(coords, action_coords))
-        free_cell = self.free_cell(attempt_coords)
-        if not free_cell:
-            return None
-        # apply direction until it reaches EOB (end of board) or another piece
-        while free_cell:
-            new_coords = attempt_coords
-            attempt_coords = tuple(np.add(new_coords, action_coords))
-            free_cell = self.free_cell(attempt_coords)
-        return new_coords
+        # the piece slides until it reaches EOB (end of board) or another piece, see tables.SLIDES
+        destination = tables.slide(tables.square(coords), tables.DIRECTION_INDEX[direction],
+                                   tables.occupied_bits(self.board))
+        return None if destination < 0 else tables.SQUARE_COORDS[destination]
 
     def available_directions(self, coords: Tuple[int, int]) -> List[Tuple[str, tuple]]:
         """
@@ -291,6 +405,10 @@ class NeutreekoGame:
         :param only_valid:
         :return: A list of tuples with the starting position and a direction
         """
+        if only_valid:
+            return [(tables.SQUARE_COORDS[square], tables.DIRECTIONS[action % len(tables.DIRECTIONS)])
+                    for action, square, _ in self.legal_moves(player).tolist()]
+
         possible_moves = []
 
         # Find player piece positions
@@ -299,17 +417,23 @@ class NeutreekoGame:
 
         # for each player piece
         for pos in list_of_coordinates:
-            if only_valid:
-                # checks which directions are available
-                dirs = self.available_directions(pos)
-                for dir in dirs:
-                    possible_moves.append((pos, dir))
-            else:
-                # adds every direction
-                for direction in const.ACTIONS_DICT.keys():
-                    possible_moves.append((pos, direction))
+            # adds every direction
+            for direction in const.ACTIONS_DICT.keys():
+                possible_moves.append((pos, direction))
         return possible_moves
 
+    def legal_moves(self, player: int = None) -> np.array:
+        """
+        Valid moves of a player, written in the preallocated move_buffer
+
+        :param player: Integer representing the player, the player to move if None
+        :return: A view of move_buffer with one (action, from square, to square) row per move, see movegen,
+            overwritten by the next call
+        """
+        player = self.current_player if player is None else player
+        return movegen.generate_moves(self.player_bits(player), tables.occupied_bits(self.board),
+                                      len(tables.DIRECTIONS), self.move_buffer)
+
     def action_handler(self, pos, dir):
         """
         After the agent chooses a move, it needs to be checked to see if it's valid
@@ -319,6 +443,9 @@ class NeutreekoGame:
         :param dir: The direction that the piece will be moved to
         :return:
         """
+        # an empty origin isn't a move, as in BitboardGame: "moving" its 0 would complete an empty line
+        if not self.value_in_board(pos):
+            return None
         result = self.check_direction(pos, dir)
         if not result:
             return None
@@ -326,22 +453,76 @@ class NeutreekoGame:
         self.update_game(pos, result)
         self.update_player_turns()
 
-        white_win = utils.find_sequence_board(self.board, const.WHITE_WIN)
-        black_win = utils.find_sequence_board(self.board, const.BLACK_WIN)
-
-        self.game_over = (white_win or black_win)
+        # only the lines through the moved piece can have been completed, and only by its owner
+        self.game_over = utils.find_sequence_cell(self.board, result, self.value_in_board(result))
         move_type = "win" if self.game_over else "default"
+        if self.update_repetitions():
+            move_type = "draw"
         return dir, result, move_type
 
+    def push(self, move: Tuple[tuple, str]) -> Union[None, str]:
+        """
+        Makes a move that can be undone with pop, without copying the board
+
+        :param move: A tuple with the starting position and a direction, as returned by get_possible_moves
+        :return: The move type, None if the move is not valid
+        """
+        pos, dir = move
+        game_over, draw = self.game_over, self.draw
+        move_check = self.action_handler(pos, dir)
+        if not move_check:
+            return None
+        # undo record: from, to and the previous game_over and draw
+        self.move_stack.append((pos, move_check[1], game_over, draw))
+        return move_check[2]
+
+    def pop(self) -> None:
+        """
+        Undoes the last move made with push
+        """
+        pos, result, game_over, draw = self.move_stack.pop()
+        self.forget_repetition()
+        self.update_game(result, pos)
+        self.current_player = const.WHITE if self.current_player == const.BLACK else const.BLACK
+        self.turns_count -= 1
+        self._hash ^= tables.ZOBRIST_SIDE
+        self.game_over = game_over
+        self.draw = draw
+
+    def update_repetitions(self) -> bool:
+        """
+        Counts one more occurrence of the current position, and draws the game on the third one.
+        A win on the same move takes precedence
+
+        :return: True if the move drew the game
+        """
+        count = self.repetitions.get(self._hash, 0) + 1
+        self.repetitions[self._hash] = count
+        if count >= const.REPETITIONS and not self.game_over:
+            self.game_over = self.draw = True
+            return True
+        return False
+
+    def forget_repetition(self) -> None:
+        """
+        Removes the occurrence of the current position counted by update_repetitions, before the move is undone
+        """
+        count = self.repetitions[self._hash] - 1
+        if count:
+            self.repetitions[self._hash] = count
+        else:
+            del self.repetitions[self._hash]
+
     def update_player_turns(self):
         self.current_player = const.WHITE if self.current_player == const.BLACK else const.BLACK
         self.turns_count += 1
+        self._hash ^= tables.ZOBRIST_SIDE
 
     def update_game(self, pos, result):
         player = self.value_in_board(pos)
         self.replace_in_board(result, player)
         self.replace_in_board(pos, 0)
-        pass
+        self._hash ^= tables.ZOBRIST[player][tables.square(pos)] ^ tables.ZOBRIST[player][tables.square(result)]
 
     def render(self):
         print(self.board)
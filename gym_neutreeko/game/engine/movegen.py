@@ -0,0 +1,48 @@
+"""
+Move generation with the lookup tables of tables.SLIDES.
+
+The moves are written in a preallocated int array, one row per valid move with the columns
+ACTION (piece * nb_directions + direction, the pieces numbered in increasing square order),
+FROM and TO (the square indexes before and after the move).
+"""
+import numpy as np
+
+from gym_neutreeko.game.common import tables
+
+ACTION, FROM, TO = 0, 1, 2
+MAX_MOVES = 3 * len(tables.DIRECTIONS)
+
+
+def new_move_buffer() -> np.array:
+    """
+    Returns an array large enough for the moves of any position
+
+    :return: An uninitialized (MAX_MOVES, 3) int array
+    """
+    return np.empty((MAX_MOVES, 3), dtype=np.intp)
+
+
+def generate_moves(pieces: int, occupied: int, nb_directions: int = 8, out: np.array = None) -> np.array:
+    """
+    Generates every valid move of a player
+
+    :param pieces: Bitboard of the pieces of the player to move
+    :param occupied: Bitboard of every piece on the board
+    :param nb_directions: 4 for the easy game (the first 4 of tables.DIRECTIONS), 8 for the full game
+    :param out: The buffer to write the moves to, a new one if None
+    :return: A view of the first rows of out, one (action, from, to) row per valid move
+    """
+    if out is None:
+        out = new_move_buffer()
+    moves = []
+    for piece, index in enumerate(tables.bits_to_squares(pieces)):
+        slides = tables.SLIDES[index]
+        masks = tables.RAY_MASKS[index]
+        for direction in range(nb_directions):
+            destination = slides[direction][occupied & masks[direction]]
+            if destination >= 0:
+                moves.append((piece * nb_directions + direction, index, destination))
+    # a single copy into the buffer is faster than one write per row
+    if moves:
+        out[:len(moves)] = moves
+    return out[:len(moves)]
@@ -0,0 +1,167 @@
+"""
+Opt-in profiling of the hot paths of the environments.
+
+Profiler wraps, only while it is active, the functions a step goes through: env.step, env.process,
+the observation property, the action_handler and check_direction of the engine, and the win checks
+of NeutreekoUtils. Nothing is patched outside of the `with` block, so a profiler that isn't used
+costs nothing. Times are inclusive: action_handler contains the check_direction it calls.
+
+    with Profiler(env, trace=True) as profiler:
+        ...
+        with profiler.section('agent'):
+            action = agent.choice(env)
+        env.step(action)
+    print(profiler.summary())
+    profiler.dump_chrome_trace('trace.json')  # chrome://tracing, Perfetto or speedscope
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from gym_neutreeko.game.common.gameutils import NeutreekoUtils
+
+# methods of the environment and of its engine, wrapped on the instances
+ENV_METHODS = ('step', 'process')
+GAME_METHODS = ('action_handler', 'check_direction')
+# static methods of NeutreekoUtils, wrapped on the class, so they are timed for every environment
+UTILS_METHODS = ('find_sequence_board', 'find_sequence_cell')
+
+
+class Profiler:
+    """
+    Records the number of calls and cumulative time of the hot paths of an environment,
+    and optionally every call as an event of a Chrome trace
+    """
+    def __init__(self, env, trace: bool = False, max_events: int = 1000000):
+        """
+        :param env: A NeutreekoEnv or NeutreekoEasyEnv
+        :param trace: Keep every call for dump_chrome_trace
+        :param max_events: Calls kept for the trace, the later ones are only counted
+        """
+        self.env = env
+        self.trace = trace
+        self.max_events = max_events
+        # name -> [calls, nanoseconds]
+        self.stats = {}
+        # (name, start, duration) in nanoseconds
+        self.events = []
+        self._origin = time.perf_counter_ns()
+        self._restore = []
+
+    def _record(self, name: str, start: int, end: int) -> None:
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = [0, 0]
+        stat[0] += 1
+        stat[1] += end - start
+        if self.trace and len(self.events) < self.max_events:
+            self.events.append((name, start - self._origin, end - start))
+
+    def wrap(self, name: str, function):
+        """
+        Returns function, timed under name, to profile code outside the environment as the agent
+        """
+        record = self._record
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, start, clock())
+        return timed
+
+    @contextmanager
+    def section(self, name: str):
+        """
+        Times a block of code, as the choice of an agent, under a name of its own
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self._record(name, start, time.perf_counter_ns())
+
+    def start(self) -> None:
+        """
+        Installs the wrappers, done by `with`
+        """
+        if self._restore:
+            return
+        for owner, names in ((self.env, ENV_METHODS), (self.env.game, GAME_METHODS)):
+            for name in names:
+                if hasattr(owner, name):
+                    setattr(owner, name, self.wrap(name, getattr(owner, name)))
+                    self._restore.append((owner, name, None))
+        for name in UTILS_METHODS:
+            original = NeutreekoUtils.__dict__[name]
+            setattr(NeutreekoUtils, name, staticmethod(self.wrap(name, original.__func__)))
+            self._restore.append((NeutreekoUtils, name, original))
+
+        # a property can only be replaced on the class, the other instances keep their untimed path
+        env_class = type(self.env)
+        original = env_class.__dict__.get('observation')
+        if isinstance(original, property):
+            env = self.env
+            timed = self.wrap('observation', original.fget)
+            setattr(env_class, 'observation',
+                    property(lambda obj: timed(obj) if obj is env else original.fget(obj), doc=original.__doc__))
+            self._restore.append((env_class, 'observation', original))
+
+    def stop(self) -> None:
+        """
+        Removes the wrappers, done at the end of `with`
+        """
+        for owner, name, original in reversed(self._restore):
+            if original is None:
+                # the instance attribute hid the method of the class
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._restore = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset(self) -> None:
+        """
+        Forgets the recorded calls
+        """
+        self.stats = {}
+        self.events = []
+        self._origin = time.perf_counter_ns()
+
+    def summary(self) -> str:
+        """
+        Table of the recorded calls, the most expensive first
+        """
+        rows = sorted(self.stats.items(), key=lambda item: -item[1][1])
+        width = max([len(name) for name in self.stats] + [8])
+        lines = [f"{'function':<{width}} {'calls':>10} {'total ms':>10} {'per call us':>12}"]
+        for name, (calls, total) in rows:
+            lines.append(f"{name:<{width}} {calls:>10} {total / 1e6:>10.1f} {total / calls / 1e3:>12.2f}")
+        return '\n'.join(lines)
+
+    def chrome_trace(self) -> dict:
+        """
+        The recorded calls in the Trace Event Format, as complete events in microseconds
+        """
+        pid = os.getpid()
+        return {
+            'traceEvents': [{'name': name, 'ph': 'X', 'ts': start / 1e3, 'dur': duration / 1e3, 'pid': pid, 'tid': 0}
+                            for name, start, duration in self.events],
+            'displayTimeUnit': 'ms',
+        }
+
+    def dump_chrome_trace(self, path: str) -> None:
+        """
+        Writes chrome_trace as a JSON file
+        """
+        with open(path, 'w') as file:
+            json.dump(self.chrome_trace(), file)
@@ -0,0 +1,205 @@
+import time
+import multiprocessing as mp
+from typing import Tuple
+
+import numpy as np
+
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common.shared import SharedArray
+
+
+def _worker(index: int, first: int, nb_games: int, easy: bool, max_turns: int, seed: 'np.random.SeedSequence',
+            specs: dict, connection) -> None:
+    """
+    Loop of a worker process: owns nb_games environments and steps them when the learner asks to
+
+    :param index: Index of the worker
+    :param first: Index of the first game of this worker in the shared arrays
+    :param nb_games: How many games this worker owns
+    :param easy: Use NeutreekoEasyEnv instead of NeutreekoEnv
+    :param max_turns: max_turns of each environment
+    :param seed: Seed sequence of this worker, spawned again into one stream per environment
+    :param specs: The spec of each shared array, by name
+    :param connection: End of the pipe to the learner
+    """
+    from gym_neutreeko.envs import NeutreekoEnv, NeutreekoEasyEnv
+
+    shared = {key: SharedArray(shape, dtype, name) for key, (shape, dtype, name) in specs.items()}
+    games = slice(first, first + nb_games)
+    observations, rewards, dones = shared['observations'].array, shared['rewards'].array, shared['dones'].array
+    players, actions, counters = shared['players'].array, shared['actions'].array[games], shared['counters'].array
+
+    env_class = NeutreekoEasyEnv if easy else NeutreekoEnv
+    envs = [env_class(max_turns=max_turns, bitboard=True, seed=child) for child in seed.spawn(nb_games)]
+
+    try:
+        while True:
+            command, slot = connection.recv()
+            if command == 'close':
+                break
+            if command == 'reset':
+                for i, env in enumerate(envs):
+                    env.reset()
+                    observations[slot, first + i] = env.game.board
+                    players[slot, first + i] = env.game.current_player
+                rewards[slot, games] = 0
+                dones[slot, games] = False
+            elif command == 'step':
+                episodes = 0
+                for i, env in enumerate(envs):
+                    _, reward, done, _ = env.step(int(actions[i]))
+                    if done:
+                        env.reset()
+                        episodes += 1
+                    observations[slot, first + i] = env.game.board
+                    rewards[slot, first + i] = reward
+                    dones[slot, first + i] = done
+                    players[slot, first + i] = env.game.current_player
+                counters[index, 0] += nb_games
+                counters[index, 1] += episodes
+            connection.send(command)
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        for array in shared.values():
+            array.close()
+        connection.close()
+
+
+class RolloutPool:
+    """
+    Runs nb_workers subprocesses, each owning games_per_worker environments.
+
+    The learner writes one int action per game with step(), using the encoding of NeutreekoVectorEnv
+    (piece * 8 + direction, or piece * 4 + direction for the easy game).
+    Workers write the resulting observations, rewards, dones and players to move into shared memory
+    ring buffers of `capacity` steps, so the boards are never pickled: only a short command goes
+    through each pipe. The arrays returned by step() are views of the current slot of the ring,
+    valid until the ring wraps around. Finished games are reset by their worker.
+    """
+    def __init__(self, nb_workers: int, games_per_worker: int, easy: bool = False, max_turns: int = 200,
+                 capacity: int = 1, seed=None, start_method: str = None):
+        self.nb_workers = nb_workers
+        self.games_per_worker = games_per_worker
+        self.nb_games = nb_workers * games_per_worker
+        self.capacity = capacity
+        self.step_count = 0
+        self.slot = 0
+
+        n = self.nb_games
+        self.shared = {
+            'observations': SharedArray((capacity, n, const.BOARD_SIZE, const.BOARD_SIZE), np.int8),
+            'rewards': SharedArray((capacity, n), np.float32),
+            'dones': SharedArray((capacity, n), np.bool_),
+            'players': SharedArray((capacity, n), np.int8),
+            'actions': SharedArray((n,), np.int64),
+            # steps and finished episodes of each worker
+            'counters': SharedArray((nb_workers, 2), np.int64),
+        }
+        specs = {key: array.spec for key, array in self.shared.items()}
+
+        # every environment gets an independent stream derived from the same root seed
+        seeds = np.random.SeedSequence(seed).spawn(nb_workers)
+
+        context = mp.get_context(start_method)
+        self.connections = []
+        self.processes = []
+        for index in range(nb_workers):
+            parent_end, child_end = context.Pipe()
+            process = context.Process(target=_worker, daemon=True,
+                                      args=(index, index * games_per_worker, games_per_worker, easy, max_turns,
+                                            seeds[index], specs, child_end))
+            process.start()
+            child_end.close()
+            self.connections.append(parent_end)
+            self.processes.append(process)
+        self.closed = False
+        self.start_time = time.perf_counter()
+
+    def _broadcast(self, command: str) -> None:
+        """
+        Sends a command to every worker and waits for all of them to finish it
+        :param command: 'reset' or 'step'
+        """
+        for connection in self.connections:
+            connection.send((command, self.slot))
+        for connection in self.connections:
+            connection.recv()
+
+    def reset(self) -> np.array:
+        """
+        Resets every game
+        :return: The observations, a (nb_games, 5, 5) view
+        """
+        self._broadcast('reset')
+        return self.shared['observations'].array[self.slot]
+
+    def step(self, actions) -> Tuple[np.array, np.array, np.array, np.array]:
+        """
+        Performs one action on each game
+        :param actions: nb_games int actions
+        :return: observations, rewards, dones and players to move, views of the new ring slot
+        """
+        self.shared['actions'].array[:] = actions
+        self.step_count += 1
+        self.slot = self.step_count % self.capacity
+        self._broadcast('step')
+        return (self.shared['observations'].array[self.slot], self.shared['rewards'].array[self.slot],
+                self.shared['dones'].array[self.slot], self.shared['players'].array[self.slot])
+
+    @property
+    def ring(self) -> dict:
+        """
+        The whole ring buffers, indexed by [step % capacity]
+        :return: A dict of arrays
+        """
+        return {key: self.shared[key].array for key in ('observations', 'rewards', 'dones', 'players')}
+
+    def stats(self) -> dict:
+        """
+        Throughput counters
+        :return: A dict with the total steps and episodes, per worker steps and the steps per second
+        """
+        counters = self.shared['counters'].array
+        elapsed = time.perf_counter() - self.start_time
+        steps = int(counters[:, 0].sum())
+        return {
+            'steps': steps,
+            'episodes': int(counters[:, 1].sum()),
+            'worker_steps': counters[:, 0].tolist(),
+            'elapsed': elapsed,
+            'steps_per_sec': steps / elapsed if elapsed else 0.0,
+        }
+
+    def close(self, timeout: float = 5) -> None:
+        """
+        Stops the workers and frees the shared memory
+        :param timeout: Seconds to wait for each worker before terminating it
+        """
+        if self.closed:
+            return
+        self.closed = True
+        for connection in self.connections:
+            try:
+                connection.send(('close', 0))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for connection in self.connections:
+            connection.close()
+        for array in self.shared.values():
+            array.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        if not getattr(self, 'closed', True):
+            self.close()
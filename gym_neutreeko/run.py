@@ -0,0 +1,212 @@
+"""
+Headless episode runner, for long training runs.
+
+Drives an agent with the choice/update/episode_update protocol of the examples and keeps one record
+per episode in a preallocated ring buffer. Each time the buffer is full, it is appended to a binary
+file as raw METRICS_DTYPE records, so nothing grows in memory and nothing is printed per episode.
+The file is read back with read_metrics, for plotting in a separate step.
+
+Usage:
+    python -m gym_neutreeko.run examples.QAgent:QAgent --episodes 100000 --output metrics.bin [--full]
+"""
+import argparse
+import importlib
+import json
+import sys
+import time
+
+import numpy as np
+
+METRICS_DTYPE = np.dtype([
+    ('episode', np.int64),
+    ('turns', np.int32),
+    ('reward', np.float32),
+    # player who made 3 in a row, 0 if the episode was drawn or cut by max_turns
+    ('winner', np.int8),
+    ('seconds', np.float32),
+])
+
+
+class MetricsWriter:
+    """
+    Ring buffer of episode records, appended to a binary file each time it is full and on close.
+    The last `size` records stay in the buffer after a flush, for rolling statistics
+    """
+    def __init__(self, path: str = None, size: int = 4096):
+        """
+        :param path: File the records are appended to, None to only keep the ring buffer
+        :param size: Number of records of the buffer
+        """
+        self.buffer = np.zeros(size, dtype=METRICS_DTYPE)
+        self.file = open(path, 'ab') if path else None
+        self.count = 0
+        self.flushed = 0
+
+    def append(self, episode: int, turns: int, reward: float, winner: int, seconds: float) -> None:
+        """
+        Writes the record of an episode, flushing the buffer to the file when it is full
+        """
+        slot = self.count % len(self.buffer)
+        self.buffer[slot] = episode, turns, reward, winner, seconds
+        self.count += 1
+        if self.count - self.flushed == len(self.buffer):
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Appends the records not written yet to the file
+        """
+        pending = self.count - self.flushed
+        if self.file is not None and pending:
+            start = self.flushed % len(self.buffer)
+            if start + pending <= len(self.buffer):
+                self.file.write(self.buffer[start:start + pending].tobytes())
+            else:
+                self.file.write(self.buffer[start:].tobytes())
+                self.file.write(self.buffer[:start + pending - len(self.buffer)].tobytes())
+            self.file.flush()
+        self.flushed = self.count
+
+    def recent(self) -> np.array:
+        """
+        The records still in the buffer, at most `size` of the last episodes, not in order
+        """
+        return self.buffer[:min(self.count, len(self.buffer))]
+
+    def close(self) -> None:
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_metrics(path: str) -> np.array:
+    """
+    Reads every record written by MetricsWriter
+
+    :param path: The metrics file
+    :return: A structured array of METRICS_DTYPE
+    """
+    return np.fromfile(path, dtype=METRICS_DTYPE)
+
+
+def progress(done: int, total: int, elapsed: float, writer: MetricsWriter, width: int = 30) -> None:
+    """
+    Redraws the progress bar on stderr
+    """
+    filled = width * done // total if total else width
+    rate = done / elapsed if elapsed else 0.0
+    recent = writer.recent()
+    mean_reward = recent['reward'].mean() if len(recent) else 0.0
+    sys.stderr.write(f"\r[{'#' * filled}{'.' * (width - filled)}] {done}/{total} episodes "
+                     f"{rate:.1f} ep/s, mean reward {mean_reward:.2f}")
+    sys.stderr.flush()
+
+
+def run(agent, env, nb_episodes: int, path: str = None, buffer_size: int = 4096, show_progress: bool = True,
+        refresh: float = 0.5) -> dict:
+    """
+    Plays nb_episodes episodes of an agent in an environment
+
+    :param agent: An object with choice(env), update(obs, reward, done, info, env) and episode_update(episode)
+    :param env: A NeutreekoEnv or NeutreekoEasyEnv
+    :param nb_episodes: Number of episodes
+    :param path: File the episode records are appended to, None to keep only the ring buffer
+    :param buffer_size: Records kept in memory between two writes
+    :param show_progress: Draw a progress bar on stderr
+    :param refresh: Seconds between two redraws of the progress bar
+    :return: Number of episodes, seconds and episodes per second
+    """
+    start = time.perf_counter()
+    next_refresh = start
+    with MetricsWriter(path, buffer_size) as writer:
+        for episode in range(1, nb_episodes + 1):
+            episode_start = time.perf_counter()
+            env.reset()
+            done = False
+            total_reward = 0.0
+            info = {}
+            while not done:
+                action = agent.choice(env)
+                obs, reward, done, info = env.step(action)
+                agent.update(obs, reward, done, info, env)
+                total_reward += reward
+            agent.episode_update(episode)
+
+            winner = info.get('player', 1) if env.game.game_over and not getattr(env.game, 'draw', False) else 0
+            now = time.perf_counter()
+            writer.append(episode, env.game.turns_count, total_reward, winner, now - episode_start)
+            if show_progress and (now >= next_refresh or episode == nb_episodes):
+                progress(episode, nb_episodes, now - start, writer)
+                next_refresh = now + refresh
+    if show_progress:
+        sys.stderr.write('\n')
+    elapsed = time.perf_counter() - start
+    return {
+        'episodes': nb_episodes,
+        'seconds': elapsed,
+        'episodes_per_sec': nb_episodes / elapsed if elapsed else 0.0,
+    }
+
+
+def load_agent(spec: str, kwargs: dict = None):
+    """
+    Builds an agent from its import path
+
+    :param spec: 'module:Class', as examples.QAgent:QAgent
+    :param kwargs: Arguments of the constructor
+    :return: The agent
+    """
+    module_name, _, class_name = spec.partition(':')
+    if not class_name:
+        module_name, _, class_name = spec.rpartition('.')
+    return getattr(importlib.import_module(module_name), class_name)(**(kwargs or {}))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs an agent for many episodes, without printing them')
+    parser.add_argument('agent', help='class of the agent, as module:Class (e.g. examples.QAgent:QAgent)')
+    parser.add_argument('--agent-kwargs', default='{}', help='JSON arguments of the agent constructor')
+    parser.add_argument('--episodes', type=int, default=1000, help='number of episodes (default: 1000)')
+    parser.add_argument('--output', default=None, help='binary file the episode records are appended to')
+    parser.add_argument('--buffer', type=int, default=4096, help='records kept in memory between writes')
+    parser.add_argument('--full', action='store_true', help='NeutreekoEnv instead of NeutreekoEasyEnv')
+    parser.add_argument('--max-turns', type=int, default=200, help='max_turns of the environment')
+    parser.add_argument('--bitboard', action='store_true', help='use the bitboard engine')
+    parser.add_argument('--quiet', action='store_true', help='no progress bar')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed of the environment and of the global np.random of the example agents, '
+                             'for a reproducible run')
+    parser.add_argument('--profile', action='store_true', help='print the time spent in the hot paths of the env')
+    parser.add_argument('--trace', default=None, help='also write the profiled calls as a Chrome trace JSON file')
+    args = parser.parse_args()
+
+    from gym_neutreeko.envs import NeutreekoEnv, NeutreekoEasyEnv
+
+    env_class = NeutreekoEnv if args.full else NeutreekoEasyEnv
+    env_seed = None
+    if args.seed is not None:
+        # QAgent, SARSAAgent and RandomAgent draw from the global np.random, seeded before they are built
+        env_seed, agent_seed = np.random.SeedSequence(args.seed).spawn(2)
+        np.random.seed(agent_seed.generate_state(4))
+    run_env = env_class(max_turns=args.max_turns, bitboard=args.bitboard, seed=env_seed)
+    run_agent = load_agent(args.agent, json.loads(args.agent_kwargs))
+    if args.profile or args.trace:
+        from gym_neutreeko.profiling import Profiler
+
+        with Profiler(run_env, trace=args.trace is not None) as profiler:
+            run_agent.choice = profiler.wrap('agent.choice', run_agent.choice)
+            run_agent.update = profiler.wrap('agent.update', run_agent.update)
+            summary = run(run_agent, run_env, args.episodes, args.output, args.buffer, not args.quiet)
+        print(profiler.summary())
+        if args.trace:
+            profiler.dump_chrome_trace(args.trace)
+    else:
+        summary = run(run_agent, run_env, args.episodes, args.output, args.buffer, not args.quiet)
+    print(f"{summary['episodes']} episodes in {summary['seconds']:.1f}s ({summary['episodes_per_sec']:.1f} ep/s)")
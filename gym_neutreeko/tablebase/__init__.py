@@ -0,0 +1 @@
+from gym_neutreeko.tablebase.reader import Tablebase
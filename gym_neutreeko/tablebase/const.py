@@ -0,0 +1,12 @@
+"""
+Values and file names of a tablebase, shared by the solver and the reader
+"""
+# Value of a position for the player to move
+DRAW = 0
+WIN = 1
+LOSS = 2
+# The player to move already has 3 in a row, so the position can't be reached in a game
+ILLEGAL = 3
+
+VALUES_FILE = 'values.npy'
+DISTANCE_FILE = 'distance.npy'
@@ -0,0 +1,118 @@
+import os
+from typing import Tuple, List, Union
+
+import numpy as np
+
+from gym_neutreeko.game.common import const
+from gym_neutreeko.game.common import ranking
+from gym_neutreeko.game.common import tables
+from gym_neutreeko.game.engine import movegen
+from gym_neutreeko.tablebase.const import DRAW, LOSS, VALUES_FILE, DISTANCE_FILE
+
+
+class Tablebase:
+    """
+    Reads the files written by the solver.
+
+    The files are memory-mapped read-only, so opening them doesn't read anything, only the pages
+    of the looked up positions are loaded, and every process mapping the same files shares those pages
+    through the OS page cache
+    """
+    def __init__(self, directory: str, distance: bool = True):
+        """
+        :param directory: Directory with the files written by solver.save
+        :param distance: Also map the distances, if the file exists
+        """
+        self.values = np.load(os.path.join(directory, VALUES_FILE), mmap_mode='r')
+        distance_path = os.path.join(directory, DISTANCE_FILE)
+        self.distances = np.load(distance_path, mmap_mode='r') if distance and os.path.exists(distance_path) else None
+
+    @staticmethod
+    def split(board: np.array, player: int) -> Tuple[int, int]:
+        """
+        Bitboards of the player to move and of the other player
+
+        :param board: A np array of size (5,5)
+        :param player: The player to move
+        :return: The two bitboards
+        """
+        other = const.WHITE if player == const.BLACK else const.BLACK
+        return tables.board_to_bits(board, player), tables.board_to_bits(board, other)
+
+    def index_value(self, index: int) -> int:
+        """
+        Value of a position index for the player to move
+
+        :param index: A position index, see ranking.position_index
+        :return: const.DRAW, WIN, LOSS or ILLEGAL
+        """
+        return (int(self.values[index >> 2]) >> ((index & 3) << 1)) & 3
+
+    def index_distance(self, index: int) -> Union[None, int]:
+        """
+        Plies left until the end of the game with a perfect play, None without the distances file
+
+        :param index: A position index, see ranking.position_index
+        :return: The number of plies, 0 for draws
+        """
+        return None if self.distances is None else int(self.distances[index])
+
+    def value(self, board: np.array, player: int) -> int:
+        """
+        Value of a position for the player to move
+
+        :param board: A np array of size (5,5)
+        :param player: The player to move
+        :return: const.DRAW, WIN, LOSS or ILLEGAL
+        """
+        return self.index_value(ranking.position_index(*self.split(board, player)))
+
+    def distance(self, board: np.array, player: int) -> Union[None, int]:
+        """
+        Plies left until the end of the game with a perfect play
+
+        :param board: A np array of size (5,5)
+        :param player: The player to move
+        :return: The number of plies, None without the distances file
+        """
+        return self.index_distance(ranking.position_index(*self.split(board, player)))
+
+    @staticmethod
+    def moves(mover: int, other: int) -> List[List[int]]:
+        """
+        Every valid move of the player to move, see movegen.generate_moves
+
+        :param mover: Bitboard of the pieces of the player to move
+        :param other: Bitboard of the pieces of the other player
+        :return: A list of [action, square, destination square], the action as taken by NeutreekoEnv.step
+        """
+        return movegen.generate_moves(mover, mover | other).tolist()
+
+    def best_move(self, board: np.array, player: int) -> Union[None, int]:
+        """
+        Optimal move: the fastest win, a move keeping the draw, or the slowest loss.
+        Without the distances file, wins and losses are not ranked by distance, so repeating
+        this move in a won position is not guaranteed to ever finish the game
+
+        :param board: A np array of size (5,5)
+        :param player: The player to move
+        :return: The action taken by NeutreekoEnv.step (piece * 8 + direction), None if there is no valid move
+        """
+        mover, other = self.split(board, player)
+        best = None
+        best_key = None
+        for action, square, destination in self.moves(mover, other):
+            moved = mover ^ tables.SQUARE_BIT[square] ^ tables.SQUARE_BIT[destination]
+            index = ranking.position_index(other, moved)
+            # the result is seen from the other player: their loss is our win
+            value = self.index_value(index)
+            distance = self.index_distance(index) or 0
+            if value == LOSS:
+                key = (2, -distance)
+            elif value == DRAW:
+                key = (1, 0)
+            else:
+                key = (0, distance)
+            if best_key is None or key > best_key:
+                best, best_key = action, key
+        return best
@@ -0,0 +1,244 @@
+"""
+Retrograde analysis of Neutreeko.
+
+Every position is seen from the player to move and indexed with ranking.position_index, so the colours
+don't matter and the 3542000 positions cover both sides. The moves are the ones of NeutreekoGame.check_direction:
+a piece slides along its ray of tables.RAYS until the next piece or the edge of the board.
+
+Positions where the other player has 3 in a row are lost in 0 plies. Then, rounds alternate:
+an odd round n marks as won in n plies the positions with a move to a position lost in n - 1,
+an even round n marks as lost in n plies the positions where every move leads to a won position.
+When two rounds in a row change nothing, the positions left are draws.
+
+Usage:
+    python -m gym_neutreeko.tablebase.solver <directory> [--workers N]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+from typing import Tuple
+
+import numpy as np
+
+from gym_neutreeko.game.common import ranking
+from gym_neutreeko.game.common import tables
+from gym_neutreeko.game.common.shared import SharedArray
+from gym_neutreeko.tablebase.const import DRAW, WIN, LOSS, ILLEGAL, VALUES_FILE, DISTANCE_FILE
+
+CHUNK_SIZE = 1 << 16
+
+_BINOMIALS = np.array(ranking.BINOMIALS, dtype=np.int64)
+_UNRANK = ranking.UNRANK_TABLE.astype(np.int64)
+_HAS_LINE = np.array([ranking.unrank_bits(rank) in tables.WIN_MASKS for rank in range(ranking.NB_EASY_STATES)])
+
+# arrays of the worker processes, set by _attach
+_shared = {}
+
+
+def _rank(squares: np.array) -> np.array:
+    """
+    Vectorized ranking.rank_bits
+
+    :param squares: A (n, 3) array of squares, increasing along each row
+    :return: The n ranks
+    """
+    return _BINOMIALS[0, squares[:, 0]] + _BINOMIALS[1, squares[:, 1]] + _BINOMIALS[2, squares[:, 2]]
+
+
+def position_squares(index: np.array) -> Tuple[np.array, np.array]:
+    """
+    Vectorized ranking.position_pieces
+
+    :param index: Array of n position indexes
+    :return: Two (n, 3) arrays with the squares of the player to move and of the other player
+    """
+    mover_rank, other_rank = np.divmod(index, ranking.NB_BLACK_PLACEMENTS)
+    mover = _UNRANK[mover_rank]
+    other = _UNRANK[other_rank]
+    # put back the squares of the player to move, from the lowest one, see ranking._expand
+    for piece in range(ranking.NB_PIECES):
+        other += other >= mover[:, piece:piece + 1]
+    return mover, other
+
+
+def successors(index: np.array) -> Tuple[np.array, np.array]:
+    """
+    Generates the 24 moves of each position (3 pieces and 8 directions, in the order of tables.DIRECTIONS)
+
+    :param index: Array of n position indexes
+    :return: A (n, 24) array with the index of the resulting positions, seen from the other player,
+        and a (n, 24) boolean array telling which moves are valid
+    """
+    count = len(index)
+    rows = np.arange(count)
+    mover, other = position_squares(index)
+
+    occupied = np.full(count, 1 << tables.NB_SQUARES, dtype=np.int64)
+    for piece in range(ranking.NB_PIECES):
+        occupied |= np.left_shift(1, mover[:, piece]) | np.left_shift(1, other[:, piece])
+
+    # after the move, the other player is the one to move
+    other_rank = _rank(other) * ranking.NB_BLACK_PLACEMENTS
+
+    result = np.zeros((count, ranking.NB_PIECES * len(tables.DIRECTIONS)), dtype=np.int64)
+    valid = np.zeros(result.shape, dtype=bool)
+    for piece in range(ranking.NB_PIECES):
+        for direction in range(len(tables.DIRECTIONS)):
+            move = piece * len(tables.DIRECTIONS) + direction
+            # the sentinel square at the end of every ray is always occupied
+            ray = tables.RAY_TABLE[mover[:, piece], direction]
+            distance = ((occupied[:, None] >> ray) & 1).argmax(axis=1)
+            valid[:, move] = distance > 0
+
+            moved = mover.copy()
+            moved[:, piece] = np.where(distance > 0, ray[rows, distance - 1], mover[:, piece])
+            moved.sort(axis=1)
+            # rank the moved pieces among the squares left free by the other player, see ranking._compress
+            moved -= (moved[:, :, None] > other[:, None, :]).sum(axis=2)
+            result[:, move] = other_rank + _rank(moved)
+    return result, valid
+
+
+def _attach(specs: dict) -> None:
+    """
+    Initializer of the worker processes, attaches the shared arrays
+    :param specs: The spec of each shared array, by name
+    """
+    for key, (shape, dtype, name) in specs.items():
+        _shared[key] = SharedArray(shape, dtype, name)
+
+
+def _terminal_chunk(bounds: Tuple[int, int]) -> int:
+    """
+    Marks the illegal positions and the positions lost in 0 plies of a chunk
+
+    :param bounds: First and last + 1 position indexes of the chunk
+    :return: How many positions were marked
+    """
+    values = _shared['values'].array
+    distance = _shared['distance'].array
+    index = np.arange(*bounds)
+    mover, other = position_squares(index)
+    lost = _HAS_LINE[_rank(other)]
+    illegal = _HAS_LINE[index // ranking.NB_BLACK_PLACEMENTS]
+    values[index[lost]] = LOSS
+    values[index[illegal]] = ILLEGAL
+    distance[index[lost | illegal]] = 0
+    return int((lost | illegal).sum())
+
+
+def _round_chunk(task: Tuple[int, int, int]) -> int:
+    """
+    Runs a round of the retrograde analysis on the undecided positions of a chunk.
+    A round only writes values that its own checks don't look at (WIN in odd rounds, LOSS in even ones),
+    so the chunks of a round can run in any order and in parallel
+
+    :param task: First and last + 1 position indexes of the chunk, and the round number
+    :return: How many positions were decided
+    """
+    start, stop, plies = task
+    values = _shared['values'].array
+    distance = _shared['distance'].array
+    index = start + np.flatnonzero(values[start:stop] == DRAW)
+    if not len(index):
+        return 0
+    result, valid = successors(index)
+    outcome = values[result]
+    if plies % 2:
+        decided = (valid & (outcome == LOSS)).any(axis=1)
+        values[index[decided]] = WIN
+    else:
+        decided = valid.any(axis=1) & (~valid | (outcome == WIN)).all(axis=1)
+        values[index[decided]] = LOSS
+    distance[index[decided]] = plies
+    return int(decided.sum())
+
+
+def solve(workers: int = None, verbose: bool = True) -> Tuple[np.array, np.array]:
+    """
+    Solves every position
+
+    :param workers: Number of processes, all the cores by default
+    :param verbose: Prints the progress of each round
+    :return: The value (DRAW, WIN, LOSS or ILLEGAL) and the distance to the result, in plies, of every position
+    """
+    workers = workers or os.cpu_count()
+    shared = {
+        'values': SharedArray((ranking.NB_POSITIONS,), np.uint8),
+        'distance': SharedArray((ranking.NB_POSITIONS,), np.uint8),
+    }
+    specs = {key: array.spec for key, array in shared.items()}
+    chunks = [(start, min(start + CHUNK_SIZE, ranking.NB_POSITIONS))
+              for start in range(0, ranking.NB_POSITIONS, CHUNK_SIZE)]
+    pool = mp.Pool(workers, initializer=_attach, initargs=(specs,)) if workers > 1 else None
+    if pool is None:
+        _attach(specs)
+    run = pool.map if pool else lambda function, tasks: list(map(function, tasks))
+
+    try:
+        start_time = time.perf_counter()
+        decided = sum(run(_terminal_chunk, chunks))
+        if verbose:
+            print(f"Round 0    {decided: >8} positions decided")
+        plies = 0
+        idle_rounds = 0
+        while idle_rounds < 2:
+            plies += 1
+            decided = sum(run(_round_chunk, [(start, stop, plies) for start, stop in chunks]))
+            idle_rounds = 0 if decided else idle_rounds + 1
+            if verbose:
+                print(f"Round {plies: <4} {decided: >8} positions decided ({time.perf_counter() - start_time:.1f}s)")
+        values = np.copy(shared['values'].array)
+        distance = np.copy(shared['distance'].array)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        else:
+            for array in _shared.values():
+                array.close()
+            _shared.clear()
+        for array in shared.values():
+            array.close()
+    return values, distance
+
+
+def pack(values: np.array) -> np.array:
+    """
+    Packs 2-bit values, 4 per byte, the position i being in the bits 2*(i % 4) of the byte i // 4
+
+    :param values: Array of values between 0 and 3
+    :return: The packed uint8 array
+    """
+    padded = np.zeros(-(-len(values) // 4) * 4, dtype=np.uint8)
+    padded[:len(values)] = values
+    padded = padded.reshape((-1, 4))
+    return padded[:, 0] | (padded[:, 1] << 2) | (padded[:, 2] << 4) | (padded[:, 3] << 6)
+
+
+def save(directory: str, values: np.array, distance: np.array = None) -> None:
+    """
+    Writes the packed values and the distances as .npy files that can be memory-mapped
+
+    :param directory: Destination directory, created if needed
+    :param values: The values returned by solve
+    :param distance: The distances returned by solve, not written if None
+    """
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, VALUES_FILE), pack(values))
+    if distance is not None:
+        np.save(os.path.join(directory, DISTANCE_FILE), distance)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds the Neutreeko tablebase')
+    parser.add_argument('directory', help='where to write the tablebase files')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: all cores)')
+    parser.add_argument('--no-distance', action='store_true', help='only write the values')
+    args = parser.parse_args()
+
+    solved_values, solved_distance = solve(args.workers)
+    save(args.directory, solved_values, None if args.no_distance else solved_distance)
+    print(f"Wins {np.count_nonzero(solved_values == WIN)}, losses {np.count_nonzero(solved_values == LOSS)}, "
+          f"draws {np.count_nonzero(solved_values == DRAW)}, illegal {np.count_nonzero(solved_values == ILLEGAL)}")
@@ -0,0 +1,133 @@
+"""
+Tabular temporal-difference learning over the dense state indexes of the environments (state_index).
+
+The Q-table is allocated once with one row per state, and the updates are applied to whole batches
+of transitions: the targets of a batch are computed from the table before the batch, then the
+corrections are scattered with np.add.at. A (state, action) pair seen k times in a batch gets the mean
+of its k corrections, so its step stays alpha and its value stays between the targets.
+"""
+import numpy as np
+
+
+class TabularLearner:
+    """
+    Base class of the learners, which only differ by the value of the next state used in the target
+    """
+    def __init__(self, nb_states: int, nb_actions: int, alpha: float = 0.7, discount_factor: float = 0.618,
+                 dtype=np.float64):
+        """
+        :param nb_states: Number of states, ranking.NB_EASY_STATES or ranking.NB_FULL_STATES
+        :param nb_actions: Number of actions, 12 or 24
+        :param alpha: Learning rate
+        :param discount_factor: Discount of the value of the next state
+        :param dtype: Type of the Q-table, float32 halves the memory of the full game table
+        """
+        self.Q = np.zeros((nb_states, nb_actions), dtype=dtype)
+        self.alpha = alpha
+        self.discount_factor = discount_factor
+
+    def next_values(self, next_states: np.array, next_actions: np.array, next_masks: np.array) -> np.array:
+        """
+        Value of each next state, overridden by the learners
+        """
+        raise NotImplementedError
+
+    def update(self, states: np.array, actions: np.array, rewards: np.array, next_states: np.array,
+               dones: np.array, next_actions: np.array = None, next_masks: np.array = None) -> np.array:
+        """
+        Applies a batch of transitions (s, a, r, s', done)
+
+        :param states: Int array of n state indexes
+        :param actions: Int array of n actions
+        :param rewards: Array of n rewards
+        :param next_states: Int array of n next state indexes
+        :param dones: Boolean array of n flags, True if the next state ends the game and has no value
+        :param next_actions: Int array of n actions taken in the next states, used by SARSA
+        :param next_masks: (n, nb_actions) boolean array of the valid actions of the next states,
+            as in info['action_mask']. The max and the expectation only look at the valid actions
+        :return: The n temporal-difference errors
+        """
+        states = np.asarray(states)
+        actions = np.asarray(actions)
+        next_values = self.next_values(np.asarray(next_states), next_actions, next_masks)
+        targets = np.asarray(rewards) + self.discount_factor * np.where(dones, 0, next_values)
+        errors = targets - self.Q[states, actions]
+        # number of times each pair is in the batch, to average its corrections
+        pairs = states * self.Q.shape[1] + actions
+        counts = np.bincount(pairs, minlength=self.Q.size)[pairs]
+        np.add.at(self.Q, (states, actions), self.alpha * errors / counts)
+        return errors
+
+    def greedy(self, state: int, mask: np.array = None) -> int:
+        """
+        Best action of a state
+
+        :param state: A state index
+        :param mask: Boolean array of the valid actions, all the actions if None
+        :return: The action with the highest value
+        """
+        values = self.Q[state]
+        if mask is not None:
+            values = np.where(mask, values, -np.inf)
+        return int(np.argmax(values))
+
+    def save(self, path: str) -> None:
+        """
+        Writes the Q-table as a .npy file
+        """
+        np.save(path, self.Q)
+
+    def load(self, path: str) -> None:
+        """
+        Reads a Q-table written by save
+
+        :param path: Path of the .npy file
+        """
+        table = np.load(path)
+        if table.shape != self.Q.shape:
+            raise ValueError(f"Q-table of shape {table.shape} doesn't match {self.Q.shape}")
+        self.Q = table.astype(self.Q.dtype, copy=False)
+
+
+class QLearning(TabularLearner):
+    """
+    Off-policy: the next state is worth its best action
+    """
+    def next_values(self, next_states, next_actions, next_masks):
+        values = self.Q[next_states]
+        if next_masks is None:
+            return values.max(axis=1)
+        next_masks = np.asarray(next_masks)
+        # a state without any valid action is worth 0
+        best = np.where(next_masks, values, -np.inf).max(axis=1)
+        return np.where(next_masks.any(axis=1), best, 0)
+
+
+class SARSA(TabularLearner):
+    """
+    On-policy: the next state is worth the action actually taken in it
+    """
+    def next_values(self, next_states, next_actions, next_masks):
+        if next_actions is None:
+            raise ValueError("SARSA needs the next actions")
+        return self.Q[next_states, np.asarray(next_actions)]
+
+
+class ExpectedSARSA(TabularLearner):
+    """
+    The next state is worth the expected value of an epsilon-greedy policy over its valid actions
+    """
+    def __init__(self, *args, epsilon: float = 0.1, **kwargs):
+        """
+        :param epsilon: Exploration rate of the policy, can be changed between updates
+        """
+        super().__init__(*args, **kwargs)
+        self.epsilon = epsilon
+
+    def next_values(self, next_states, next_actions, next_masks):
+        values = self.Q[next_states]
+        masks = np.ones(values.shape, dtype=bool) if next_masks is None else np.asarray(next_masks)
+        counts = np.maximum(masks.sum(axis=1), 1)
+        best = np.where(masks, values, -np.inf).max(axis=1)
+        mean = np.where(masks, values, 0).sum(axis=1) / counts
+        return np.where(masks.any(axis=1), (1 - self.epsilon) * best + self.epsilon * mean, 0)